@@ -0,0 +1,17 @@
+# gunicorn.conf.py - Server hooks; gunicorn loads this file from the directory it is started in
+import os
+
+
+def on_starting(server):
+    directory = os.getenv("METRICS_DIR")
+    if directory and os.path.isdir(directory):
+        # Imported here: --chdir ./src/ puts the app on sys.path only after this file is read
+        from api.metrics import retire_all_workers
+        retire_all_workers(directory)
+
+
+def child_exit(server, worker):
+    directory = os.getenv("METRICS_DIR")
+    if directory:
+        from api.metrics import retire_worker
+        retire_worker(directory, worker.pid)
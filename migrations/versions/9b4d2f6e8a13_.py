@@ -0,0 +1,49 @@
+"""add the invoice number search index (FTS5 trigram on SQLite, pg_trgm on PostgreSQL)
+
+Revision ID: 9b4d2f6e8a13
+Revises: c6f1e8a2d957
+Create Date: 2026-10-18 16:52:18.730264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4d2f6e8a13'
+down_revision = 'c6f1e8a2d957'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # Needs SQLite 3.34+ for the trigram tokenizer; the triggers keep the
+        # external-content table in step with invoice (see api/search.py)
+        op.execute("CREATE VIRTUAL TABLE invoice_search USING fts5("
+                   "invoice_number, content='invoice', content_rowid='id', tokenize='trigram')")
+        op.execute("CREATE TRIGGER invoice_search_ai AFTER INSERT ON invoice BEGIN "
+                   "INSERT INTO invoice_search(rowid, invoice_number) VALUES (new.id, new.invoice_number); END")
+        op.execute("CREATE TRIGGER invoice_search_ad AFTER DELETE ON invoice BEGIN "
+                   "INSERT INTO invoice_search(invoice_search, rowid, invoice_number) "
+                   "VALUES ('delete', old.id, old.invoice_number); END")
+        op.execute("CREATE TRIGGER invoice_search_au AFTER UPDATE OF invoice_number ON invoice BEGIN "
+                   "INSERT INTO invoice_search(invoice_search, rowid, invoice_number) "
+                   "VALUES ('delete', old.id, old.invoice_number); "
+                   "INSERT INTO invoice_search(rowid, invoice_number) VALUES (new.id, new.invoice_number); END")
+        op.execute("INSERT INTO invoice_search(invoice_search) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX ix_invoice_number_trgm ON invoice USING gin (invoice_number gin_trgm_ops)")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER invoice_search_au")
+        op.execute("DROP TRIGGER invoice_search_ad")
+        op.execute("DROP TRIGGER invoice_search_ai")
+        op.execute("DROP TABLE invoice_search")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX ix_invoice_number_trgm")
@@ -17,6 +17,20 @@ depends_on = None
 
 
 def upgrade():
+    # The initial revision predates the invoice table, which used to come from
+    # db.create_all(); create it here so a fresh database can be built from
+    # migrations alone
+    if 'invoice' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table('invoice',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('invoice_number', sa.String(length=120), nullable=False),
+        sa.Column('invoice_amount', sa.Float(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('invoice_number')
+        )
+
     # ### commands auto generated by Alembic - please adjust! ###
     with op.batch_alter_table('invoice', schema=None) as batch_op:
         batch_op.add_column(sa.Column('invoice_date', sa.Date(), nullable=False))
@@ -0,0 +1,82 @@
+"""store invoice amounts as integer minor units with a currency
+
+Revision ID: e41c7a9f3b58
+Revises: b3e7d2a94c10
+Create Date: 2026-10-18 12:04:37.215806
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e41c7a9f3b58'
+down_revision = 'b3e7d2a94c10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('invoice', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('amount_minor', sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column('currency', sa.String(length=3), nullable=False, server_default='USD'))
+
+    # Existing rows are USD cents; one set-based statement, rounding so 0.1 + 0.2
+    # style floats land on the intended cent
+    op.execute("UPDATE invoice SET amount_minor = CAST(ROUND(invoice_amount * 100) AS BIGINT)")
+
+    with op.batch_alter_table('invoice', schema=None) as batch_op:
+        batch_op.alter_column('amount_minor', existing_type=sa.BigInteger(), nullable=False)
+        batch_op.drop_column('invoice_amount')
+
+    op.drop_table('invoice_summary')
+    op.create_table('invoice_summary',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('period_type', sa.String(length=5), nullable=False),
+    sa.Column('period', sa.String(length=7), nullable=False),
+    sa.Column('invoice_count', sa.Integer(), nullable=False),
+    sa.Column('total_minor', sa.BigInteger(), nullable=False),
+    sa.Column('min_minor', sa.BigInteger(), nullable=True),
+    sa.Column('max_minor', sa.BigInteger(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'currency', 'period_type', 'period')
+    )
+
+    # Backfilled with one INSERT ... SELECT ... GROUP BY per bucket kind, in the database
+    if op.get_bind().dialect.name == 'postgresql':
+        year, month = "to_char(invoice_date, 'YYYY')", "to_char(invoice_date, 'YYYY-MM')"
+    else:
+        year, month = "strftime('%Y', invoice_date)", "strftime('%Y-%m', invoice_date)"
+    # (bucket, period expression, extra GROUP BY); PostgreSQL refuses a string constant in GROUP BY
+    buckets = (('all', "''", ""), ('year', year, ", " + year), ('month', month, ", " + month))
+    for period_type, period, group_by in buckets:
+        op.execute(
+            "INSERT INTO invoice_summary (user_id, currency, period_type, period, invoice_count, "
+            "total_minor, min_minor, max_minor) "
+            f"SELECT user_id, currency, '{period_type}', {period}, count(*), sum(amount_minor), "
+            "min(amount_minor), max(amount_minor) "
+            f"FROM invoice GROUP BY user_id, currency{group_by}")
+
+
+def downgrade():
+    with op.batch_alter_table('invoice', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('invoice_amount', sa.Float(), nullable=True))
+    op.execute("UPDATE invoice SET invoice_amount = amount_minor / 100.0")
+    with op.batch_alter_table('invoice', schema=None) as batch_op:
+        batch_op.alter_column('invoice_amount', existing_type=sa.Float(), nullable=False)
+        batch_op.drop_column('currency')
+        batch_op.drop_column('amount_minor')
+
+    op.drop_table('invoice_summary')
+    op.create_table('invoice_summary',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('period_type', sa.String(length=5), nullable=False),
+    sa.Column('period', sa.String(length=7), nullable=False),
+    sa.Column('invoice_count', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Float(), nullable=False),
+    sa.Column('min_amount', sa.Float(), nullable=True),
+    sa.Column('max_amount', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'period_type', 'period')
+    )
@@ -0,0 +1,55 @@
+"""delete a user's export_job rows with the user (ON DELETE CASCADE)
+
+Revision ID: e9aecc92d735
+Revises: f2978c93926a
+Create Date: 2026-10-18 18:47:05.618240
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9aecc92d735'
+down_revision = 'f2978c93926a'
+branch_labels = None
+depends_on = None
+
+
+def export_job_table(ondelete):
+    return sa.Table('export_job', sa.MetaData(),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('format', sa.String(length=10), nullable=False),
+    sa.Column('filters', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=10), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=True),
+    sa.Column('size_bytes', sa.BigInteger(), nullable=True),
+    sa.Column('error', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete=ondelete),
+    sa.PrimaryKeyConstraint('id'),
+    sa.Index('ix_export_job_created_at', 'created_at'),
+    sa.Index('ix_export_job_user_id', 'user_id')
+    )
+
+
+def set_ondelete(ondelete):
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite cannot alter a constraint; copy the rows into a table declared with the new one
+        with op.batch_alter_table('export_job', recreate='always', copy_from=export_job_table(ondelete)):
+            pass
+    else:
+        # The unnamed constraint from c6f1e8a2d957 got PostgreSQL's default name
+        op.drop_constraint('export_job_user_id_fkey', 'export_job', type_='foreignkey')
+        op.create_foreign_key('export_job_user_id_fkey', 'export_job', 'user',
+                              ['user_id'], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    set_ondelete('CASCADE')
+
+
+def downgrade():
+    set_ondelete(None)
@@ -0,0 +1,51 @@
+"""delete a user's invoice_summary rows with the user (ON DELETE CASCADE)
+
+Revision ID: f2978c93926a
+Revises: 8cbd6b2889af
+Create Date: 2026-10-18 18:21:47.903512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2978c93926a'
+down_revision = '8cbd6b2889af'
+branch_labels = None
+depends_on = None
+
+
+def summary_table(ondelete):
+    return sa.Table('invoice_summary', sa.MetaData(),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('period_type', sa.String(length=5), nullable=False),
+    sa.Column('period', sa.String(length=7), nullable=False),
+    sa.Column('invoice_count', sa.Integer(), nullable=False),
+    sa.Column('total_minor', sa.BigInteger(), nullable=False),
+    sa.Column('min_minor', sa.BigInteger(), nullable=True),
+    sa.Column('max_minor', sa.BigInteger(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete=ondelete),
+    sa.PrimaryKeyConstraint('user_id', 'currency', 'period_type', 'period')
+    )
+
+
+def set_ondelete(ondelete):
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite cannot alter a constraint; copy the rows into a table declared with the new one
+        with op.batch_alter_table('invoice_summary', recreate='always', copy_from=summary_table(ondelete)):
+            pass
+    else:
+        # The unnamed constraint from b3e7d2a94c10 got PostgreSQL's default name
+        op.drop_constraint('invoice_summary_user_id_fkey', 'invoice_summary', type_='foreignkey')
+        op.create_foreign_key('invoice_summary_user_id_fkey', 'invoice_summary', 'user',
+                              ['user_id'], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    set_ondelete('CASCADE')
+
+
+def downgrade():
+    set_ondelete(None)
@@ -6,5 +6,9 @@ npm install
 npm run build
 
 pipenv install
+# Bytecode compiled at build time instead of on the first start
+pipenv run python -m compileall -q src
 
 pipenv run upgrade
+# .br/.gz siblings of the front-end build, served instead of compressing per request
+pipenv run flask compress-assets
@@ -0,0 +1,176 @@
+# src/api/assets.py - Static SPA assets from dist/: startup manifest, precompressed variants, long-lived caching
+import gzip
+import logging
+import mimetypes
+import os
+import re
+from flask import request, send_file
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; .br files are then neither written nor served
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # Vite puts content-hashed files under assets/; webpack-style names carry a hex hash
+    "ASSETS_IMMUTABLE_PATTERN": r"^assets/|[.-][0-9a-f]{8,}\.\w+$",
+    "ASSETS_IMMUTABLE_MAX_AGE": 365 * 24 * 3600,
+    "ASSETS_PRECOMPRESS_MIN_SIZE": 1024,
+}
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+PRECOMPRESSIBLE = (".html", ".js", ".mjs", ".css", ".json", ".map", ".svg", ".txt", ".xml", ".wasm", ".ico")
+INDEX = "index.html"
+
+
+class Asset:
+    __slots__ = ("path", "mimetype", "etag", "mtime", "immutable", "variants")
+
+    def __init__(self, path, stat, immutable):
+        self.path = path
+        self.mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.etag = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+        self.mtime = stat.st_mtime
+        self.immutable = immutable
+        # encoding -> (path, etag) of a precompressed sibling
+        self.variants = {}
+
+
+def build_manifest(directory, immutable_pattern):
+    """Map each URL path under `directory` to its Asset, with .br/.gz siblings as variants.
+
+    One walk of the directory; requests then never touch the filesystem to
+    find a file, only to send it.
+    """
+    manifest = {}
+    siblings = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            url_path = os.path.relpath(path, directory).replace(os.sep, "/")
+            if any(name.endswith(suffix) for _, suffix in ENCODINGS):
+                siblings.append((url_path, path))
+                continue
+            manifest[url_path] = Asset(path, os.stat(path), bool(immutable_pattern.search(url_path)))
+
+    for url_path, path in siblings:
+        for encoding, suffix in ENCODINGS:
+            original = manifest.get(url_path[:-len(suffix)]) if url_path.endswith(suffix) else None
+            if original is not None:
+                # A sibling older than its original is left over from a previous build
+                if os.stat(path).st_mtime >= original.mtime:
+                    # Strong ETags must differ between representations
+                    original.variants[encoding] = (path, f"{original.etag}-{encoding}")
+                break
+        else:
+            # A .gz or .br that is an asset in its own right (no original next to it)
+            manifest[url_path] = Asset(path, os.stat(path), bool(immutable_pattern.search(url_path)))
+    return manifest
+
+
+def precompress(directory, min_size, gzip_level=9, brotli_quality=11):
+    """Write .gz (and .br when brotli is installed) next to each compressible file; returns how many.
+
+    Run once per build, so it uses the slowest, smallest settings. A sibling
+    is only kept when it is meaningfully smaller than the original.
+    """
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith(PRECOMPRESSIBLE):
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            if len(data) < min_size:
+                continue
+            encoded = {".gz": gzip.compress(data, compresslevel=gzip_level, mtime=0)}
+            if brotli is not None:
+                encoded[".br"] = brotli.compress(data, quality=brotli_quality)
+            for suffix, body in encoded.items():
+                if len(body) < len(data) * 0.95:
+                    with open(path + suffix, "wb") as f:
+                        f.write(body)
+                    # Stamped with the original's mtime; build_manifest ignores siblings older than that
+                    stat = os.stat(path)
+                    os.utime(path + suffix, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+                    written += 1
+    return written
+
+
+class Assets:
+    """Serves the built front end from a manifest made when the app starts.
+
+    A client that accepts br or gzip gets the precompressed sibling written by
+    `flask compress-assets`. Hashed files are cached for a year as immutable;
+    everything else (index.html above all) is revalidated with its ETag on
+    each use. Files go out through send_file, so Range and conditional
+    requests work and the body is passed to the server's wsgi.file_wrapper
+    (sendfile() under gunicorn) or to a proxy with USE_X_SENDFILE. Paths that
+    are not in the manifest get index.html, for client-side routing; in debug
+    mode the manifest is rebuilt first, to pick up a new front-end build.
+    """
+
+    def __init__(self, directory, app=None):
+        self.directory = os.path.realpath(directory)
+        self.manifest = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, value in DEFAULTS.items():
+            app.config.setdefault(key, type(value)(os.getenv(key, value)))
+        # Flask's own setting: send an X-Sendfile header and let the front server read the file
+        if os.getenv("USE_X_SENDFILE"):
+            app.config["USE_X_SENDFILE"] = os.getenv("USE_X_SENDFILE") == "1"
+        self.app = app
+        self.immutable_pattern = re.compile(app.config["ASSETS_IMMUTABLE_PATTERN"])
+        self.immutable_max_age = app.config["ASSETS_IMMUTABLE_MAX_AGE"]
+        self.reload()
+        app.extensions["assets"] = self
+
+    def reload(self):
+        self.manifest = build_manifest(self.directory, self.immutable_pattern) if os.path.isdir(self.directory) else {}
+        logger.debug("Asset manifest: %d files in %s", len(self.manifest), self.directory)
+
+    def lookup(self, path):
+        asset = self.manifest.get(path)
+        if asset is None and self.app.debug:
+            self.reload()
+            asset = self.manifest.get(path)
+        return asset if asset is not None else self.manifest.get(INDEX)
+
+    def _variant(self, asset):
+        accepted = request.accept_encodings
+        best = None
+        for encoding, _ in ENCODINGS:
+            if encoding in asset.variants and accepted[encoding] > 0:
+                if best is None or accepted[encoding] > accepted[best]:
+                    best = encoding
+        return best
+
+    def serve(self, path):
+        asset = self.lookup(path)
+        if asset is None:
+            return None
+        encoding = self._variant(asset)
+        file_path, etag = asset.variants[encoding] if encoding else (asset.path, asset.etag)
+
+        response = send_file(file_path, mimetype=asset.mimetype, conditional=True,
+                             etag=etag, last_modified=asset.mtime)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        if asset.variants:
+            response.vary.add("Accept-Encoding")
+        response.accept_ranges = "bytes"
+        if asset.immutable:
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = self.immutable_max_age
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        return response
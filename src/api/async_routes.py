@@ -0,0 +1,387 @@
+# src/api/async_routes.py - Async versions of the hot API routes for the ASGI entry point (src/asgi.py)
+"""The busiest /api routes as coroutines on an AsyncEngine.
+
+Each handler runs inside a Flask request context built from the ASGI scope,
+so the sync app's building blocks work unchanged: JWT checks and their error
+handlers, rate limits, ETags, before/after_request hooks (metrics, logging,
+CORS, compression) and the session listeners that keep summaries and
+collection versions in step. Database calls are awaited, and password hashing
+is handed to a thread pool, so a slow hash or query no longer holds the
+worker.
+"""
+import asyncio
+import io
+import logging
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import Response, request, jsonify
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.exc import StaleDataError
+from starlette.responses import Response as StarletteResponse, StreamingResponse
+from starlette.routing import Route
+from .database import make_async_engine
+from .etags import make_etag, query_etag, not_modified, conditional
+from .invoice_query import (user_invoices_select, parse_limit, split_page, page_json, render_row,
+                            STREAM_BATCH_SIZE)
+from .metrics import instrument_engine
+from .models import Invoice, InvoiceSummary, User
+from .money import parse_currency, to_minor
+from .passwords import HashingBusy
+from .ratelimit import check_rate_limit, login_failed, login_succeeded
+from .summaries import summary_from_rows
+from .tokens import issue_tokens, profile_cache
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAPI:
+    """Holds the AsyncEngine and hashing thread pool for one Flask app."""
+
+    def __init__(self, app):
+        self.app = app
+        self.engine = make_async_engine(app)
+        instrument_engine(self.engine.sync_engine)
+        self.session = sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+        self.hashing = app.extensions["password_hashing"]
+        # One thread per admitted hash: they only wait on the process pool
+        self.executor = ThreadPoolExecutor(max_workers=max(1, app.config["PASSWORD_HASH_MAX_PENDING"]),
+                                           thread_name_prefix="password-hash")
+        app.extensions["async_api"] = self
+
+    async def run_hash(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def close(self):
+        self.executor.shutdown(wait=False)
+        await self.engine.dispose()
+
+    def routes(self):
+        return [
+            Route("/api/register", self.view(register), methods=["POST"]),
+            Route("/api/login", self.view(login), methods=["POST"]),
+            Route("/api/user", self.view(current_user), methods=["GET"]),
+            Route("/api/invoices", self.view(invoices), methods=["GET", "POST"]),
+            Route("/api/invoices/summary", self.view(invoice_summary), methods=["GET"]),
+            Route("/api/invoices/{invoice_id:int}", self.view(single_invoice), methods=["GET", "PUT", "DELETE"]),
+        ]
+
+    def view(self, handler):
+        async def endpoint(asgi_request):
+            body = await asgi_request.body()
+            with self.app.request_context(_environ(asgi_request.scope, body)):
+                try:
+                    rv = self.app.preprocess_request()
+                    if rv is None:
+                        rv = await handler(self, **asgi_request.path_params)
+                except Exception as e:
+                    rv = self._handle_exception(e)
+                response = self.app.make_response(rv)
+                stream = getattr(response, "async_chunks", None)
+                return _to_asgi(self.app.process_response(response), stream)
+        endpoint.__name__ = handler.__name__
+        return endpoint
+
+    def _handle_exception(self, e):
+        try:
+            return self.app.handle_user_exception(e)
+        except Exception as unhandled:
+            return self.app.handle_exception(unhandled)
+
+
+def _environ(scope, body):
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"],
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": (scope.get("server") or ("localhost", 80))[0],
+        "SERVER_PORT": str((scope.get("server") or ("localhost", 80))[1]),
+        "SERVER_PROTOCOL": "HTTP/" + scope.get("http_version", "1.1"),
+        "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": io.StringIO(),
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+        "CONTENT_LENGTH": str(len(body)),
+    }
+    for name, value in scope["headers"]:
+        key = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if key == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif key != "CONTENT_LENGTH":
+            key = "HTTP_" + key
+            environ[key] = environ[key] + "," + value if key in environ else value
+    return environ
+
+
+async def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def streaming(chunks, mimetype, etag):
+    """An empty Flask response carrying an async body: after_request hooks see the headers, ASGI sends the chunks."""
+    response = conditional(Response(mimetype=mimetype), etag)
+    response.async_chunks = chunks
+    return response
+
+
+def _raw_headers(headers):
+    # A list of pairs, not a dict, so repeated headers (Set-Cookie, Vary, ...) all go out
+    return [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers.to_wsgi_list()
+            if k.lower() != "content-length"]
+
+
+def _to_asgi(response, stream=None):
+    if stream is None:
+        # Starlette sets Content-Length from the body it is given
+        asgi_response = StarletteResponse(response.get_data(), status_code=response.status_code)
+    else:
+        if request.accept_encodings["gzip"] > 0:
+            stream = _gzip_chunks(stream)
+            response.headers["Content-Encoding"] = "gzip"
+            response.vary.add("Accept-Encoding")
+        asgi_response = StreamingResponse(stream, status_code=response.status_code)
+    asgi_response.raw_headers += _raw_headers(response.headers)
+    return asgi_response
+
+
+def _current_user_id():
+    verify_jwt_in_request()
+    return int(get_jwt_identity())
+
+
+# === USER REGISTRATION ===
+async def register(api):
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"message": "No data provided"}), 400
+    email = data.get('email')
+    password = data.get('password')
+    if not email or not password:
+        return jsonify({"message": "Email and password are required"}), 400
+    check_rate_limit("register")
+
+    async with api.session() as session:
+        if await session.scalar(select(User.id).where(User.email == email)):
+            return jsonify({"message": "Email already registered"}), 409
+        try:
+            hashed_password = await api.run_hash(api.hashing.hash, password)
+        except HashingBusy:
+            return jsonify({"message": "Server busy, please retry"}), 503, {"Retry-After": "1"}
+        user = User(email=email, password=hashed_password, is_active=True)
+        session.add(user)
+        try:
+            await session.commit()
+        except IntegrityError:
+            return jsonify({"message": "Email already registered"}), 409
+    logger.info("User registered: id=%s", user.id)
+    return jsonify({"message": "User created successfully. Please log in."}), 201
+
+
+# === USER LOGIN ===
+async def login(api):
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"message": "No data provided"}), 400
+    email = data.get('email')
+    password = data.get('password')
+    if not email or not password:
+        return jsonify({"message": "Email and password are required"}), 400
+    check_rate_limit("login", email)
+
+    async with api.session() as session:
+        user = await session.scalar(select(User).where(User.email == email))
+        try:
+            password_valid = await api.run_hash(api.hashing.verify, user.password if user else None, password)
+        except HashingBusy:
+            logger.warning("Password hashing pool saturated, rejecting login")
+            return jsonify({"message": "Server busy, please retry"}), 503, {"Retry-After": "1"}
+        if not user or not password_valid:
+            login_failed(email)
+            return jsonify({"message": "Invalid credentials"}), 401
+        login_succeeded(email)
+
+        if api.hashing.needs_rehash(user.password):
+            try:
+                user.password = await api.run_hash(api.hashing.hash, password)
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                logger.warning("Password rehash skipped for user id=%s", user.id, exc_info=True)
+
+    tokens = issue_tokens(user.id)
+    logger.info("Login succeeded for user id=%s", user.id)
+    return jsonify({
+        "token": tokens["access_token"],
+        "access_token": tokens["access_token"],
+        "refresh_token": tokens["refresh_token"],
+        "user": user.serialize(),
+    }), 200
+
+
+# === GET CURRENT USER ===
+async def current_user(api):
+    user_id = _current_user_id()
+    async with api.session() as session:
+        versions = (await session.execute(
+            select(User.version, User.invoices_version).where(User.id == user_id))).first()
+        if not versions:
+            return jsonify({"message": "User not found"}), 404
+        etag = make_etag("u", user_id, versions.version)
+        if not_modified(etag):
+            return conditional(Response(status=304), etag)
+
+        # Same (user_id, version) key as tokens.get_user_profile
+        cache = profile_cache()
+        profile = cache.get((user_id, versions.version))
+        if profile is None:
+            user = await session.get(User, user_id)
+            if user is None:
+                return jsonify({"message": "User not found"}), 404
+            profile = user.serialize()
+            cache.set((user_id, user.version), profile)
+    return conditional((jsonify({"user": profile}), 200), etag)
+
+
+async def _invoices_etag(session, kind, user_id):
+    version = await session.scalar(select(User.invoices_version).where(User.id == user_id))
+    return query_etag(kind, user_id, version or 0)
+
+
+async def _stream_ndjson(api, stmt):
+    async with api.session() as session:
+        result = await session.stream(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for rows in result.partitions(STREAM_BATCH_SIZE):
+            yield "".join([render_row(row) + "\n" for row in rows])
+
+
+# === INVOICE COLLECTION ROUTE ===
+async def invoices(api):
+    user_id = _current_user_id()
+    if request.method == 'GET':
+        stmt = user_invoices_select(user_id, request.args)
+        async with api.session() as session:
+            etag = await _invoices_etag(session, "c", user_id)
+            if not_modified(etag):
+                return conditional(Response(status=304), etag)
+
+            wants_ndjson = (request.args.get('format') == 'ndjson' or
+                            request.accept_mimetypes.best == 'application/x-ndjson')
+            if wants_ndjson:
+                if 'limit' in request.args:
+                    stmt = stmt.limit(parse_limit(request.args['limit']))
+                return streaming(_stream_ndjson(api, stmt), 'application/x-ndjson', etag)
+
+            limit = parse_limit(request.args.get('limit'))
+            rows = (await session.execute(stmt.limit(limit + 1))).all()
+        body = page_json(*split_page(rows, limit))
+        return conditional((Response(body, mimetype='application/json'), 200), etag)
+
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"message": "No data provided"}), 400
+    invoice_number = data.get('invoice_number')
+    invoice_amount = data.get('invoice_amount')
+    invoice_date_str = data.get('invoice_date')
+    if not all([invoice_number, invoice_amount]):
+        return jsonify({"message": "Invoice number and amount are required"}), 400
+    try:
+        parsed_date = datetime.strptime(invoice_date_str, '%Y-%m-%d').date() if invoice_date_str else datetime.now().date()
+    except ValueError:
+        return jsonify({"message": "Invalid date format. Use YYYY-MM-DD"}), 400
+    try:
+        currency = parse_currency(data.get('currency'))
+        amount_minor = to_minor(invoice_amount, currency)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    async with api.session() as session:
+        if await session.scalar(select(Invoice.id).where(Invoice.invoice_number == invoice_number)):
+            return jsonify({"message": "Invoice number already exists"}), 409
+        invoice = Invoice(invoice_number=invoice_number, amount_minor=amount_minor, currency=currency,
+                          invoice_date=parsed_date, user_id=user_id)
+        session.add(invoice)
+        try:
+            await session.commit()
+        except IntegrityError:
+            return jsonify({"message": "Invoice number already exists"}), 409
+    logger.info("Invoice created: id=%s user id=%s", invoice.id, user_id)
+    return jsonify(invoice.serialize()), 201
+
+
+# === INVOICE SUMMARY ===
+async def invoice_summary(api):
+    user_id = _current_user_id()
+    try:
+        currency = parse_currency(request.args.get('currency'))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    async with api.session() as session:
+        etag = await _invoices_etag(session, "s", user_id)
+        if not_modified(etag):
+            return conditional(Response(status=304), etag)
+        rows = (await session.scalars(
+            select(InvoiceSummary).filter_by(user_id=user_id, currency=currency)
+            .order_by(InvoiceSummary.period))).all()
+    return conditional((jsonify(summary_from_rows(rows, currency)), 200), etag)
+
+
+# === SINGLE INVOICE ROUTE ===
+async def single_invoice(api, invoice_id):
+    user_id = _current_user_id()
+    async with api.session() as session:
+        if request.method == 'GET':
+            version = await session.scalar(
+                select(Invoice.version).where(Invoice.user_id == user_id, Invoice.id == invoice_id))
+            if version is not None:
+                etag = make_etag("i", invoice_id, version)
+                if not_modified(etag):
+                    return conditional(Response(status=304), etag)
+
+        invoice = await session.scalar(
+            select(Invoice).where(Invoice.id == invoice_id, Invoice.user_id == user_id))
+        if not invoice:
+            return jsonify({"message": "Invoice not found or permission denied"}), 404
+
+        if request.method == 'GET':
+            return conditional((jsonify(invoice.serialize()), 200), make_etag("i", invoice.id, invoice.version))
+
+        try:
+            if request.method == 'PUT':
+                data = request.get_json(silent=True)
+                if not data:
+                    return jsonify({"message": "No data provided"}), 400
+                if 'invoice_amount' in data:
+                    try:
+                        invoice.amount_minor = to_minor(data['invoice_amount'], invoice.currency)
+                    except ValueError as e:
+                        return jsonify({"message": str(e)}), 400
+                if 'invoice_date' in data:
+                    try:
+                        invoice.invoice_date = datetime.strptime(data['invoice_date'], '%Y-%m-%d').date()
+                    except ValueError:
+                        return jsonify({"message": "Invalid date format. Use YYYY-MM-DD"}), 400
+                await session.commit()
+                logger.info("Invoice updated: id=%s", invoice.id)
+                return conditional((jsonify(invoice.serialize()), 200), make_etag("i", invoice.id, invoice.version))
+
+            await session.delete(invoice)
+            await session.commit()
+            logger.info("Invoice deleted: id=%s", invoice_id)
+            return "", 204
+        except StaleDataError:
+            await session.rollback()
+            return jsonify({"message": "Invoice was modified by another request, please retry"}), 409
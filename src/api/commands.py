@@ -1,6 +1,18 @@
 
+import re
+import time
 import click
-from api.models import db, User
+from datetime import date
+from api.models import db, User, Invoice
+from api.invoice_query import user_invoices_query, apply_keyset, encode_cursor, DEFAULT_PAGE_SIZE
+from api.invoice_import import import_invoices, iter_rows, format_for, DEFAULT_CHUNK_SIZE
+from api.summaries import rebuild_summaries
+from api.search import search_query
+from api.exports import check_format, export_query, format_for_path, write_export, FORMATS as EXPORT_FORMATS
+from api.seed import seed, DEFAULT_BATCH_SIZE as SEED_BATCH_SIZE
+from api.passwords import hash_password
+from api.assets import precompress
+from api.utils import APIException
 
 """
 In this file, you can add as many commands as you want using the @app.cli.command decorator
@@ -9,26 +21,149 @@ with youy database, for example: Import the price of bitcoin every night as 12am
 """
 def setup_commands(app):
     
-    """ 
-    This is an example command "insert-test-users" that you can run from the command line
-    by typing: $ flask insert-test-users 5
-    Note: 5 is the number of users to add
-    """
-    @app.cli.command("insert-test-users") # name of our command
-    @click.argument("count") # argument of out command
-    def insert_test_users(count):
-        print("Creating test users")
-        for x in range(1, int(count) + 1):
-            user = User()
-            user.email = "test_user" + str(x) + "@test.com"
-            user.password = "123456"
-            user.is_active = True
-            db.session.add(user)
-            db.session.commit()
-            print("User: ", user.email, " created.")
-
-        print("All test users created")
-
-    @app.cli.command("insert-test-data")
-    def insert_test_data():
-        pass
\ No newline at end of file
+    """
+    Generates users and invoices for development and load testing, e.g. 10M invoices:
+    $ flask seed --users 100000 --invoices-per-user 100 --workers 4
+    Every user gets the same password (hashed once); log in as test_user1@test.com.
+    """
+    @app.cli.command("seed")
+    @click.option("--users", default=10, show_default=True, help="Users to create")
+    @click.option("--invoices-per-user", default=20, show_default=True)
+    @click.option("--start", default=1, show_default=True, help="Number of the first user's email")
+    @click.option("--email-prefix", default="test_user", show_default=True)
+    @click.option("--password", default="123456", show_default=True)
+    @click.option("--days", default=730, show_default=True, help="Spread invoice dates over this many days")
+    @click.option("--workers", default=0, show_default=True,
+                  help="Processes generating rows; 0 generates them in this process")
+    @click.option("--batch-size", default=SEED_BATCH_SIZE, show_default=True, help="Invoices per transaction")
+    @click.option("--seed", "random_seed", default=0, show_default=True, help="Same seed, same dataset")
+    def seed_command(users, invoices_per_user, start, email_prefix, password, days, workers,
+                     batch_size, random_seed):
+        def progress(done, total, elapsed):
+            print(f"{done}/{total} invoices, {done / max(elapsed, 1e-9):.0f} rows/s")
+
+        started = time.perf_counter()
+        try:
+            created, inserted = seed(users, invoices_per_user, hash_password(password), start=start,
+                                     email_prefix=email_prefix, days=days, workers=workers,
+                                     batch_size=batch_size, random_seed=random_seed, progress=progress)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        print(f"Created {created} users and {inserted} invoices in {time.perf_counter() - started:.1f}s")
+
+    """
+    Runs EXPLAIN on the hot invoice queries and exits with an error if any of them
+    falls back to a full table scan: $ flask check-query-plans
+    """
+    @app.cli.command("check-query-plans")
+    def check_query_plans():
+        dialect = db.engine.dialect.name
+        sample_cursor = encode_cursor(Invoice(id=1, invoice_date=date.today()))
+        hot_queries = {
+            "list invoices": user_invoices_query(1, {}).limit(DEFAULT_PAGE_SIZE + 1),
+            "list invoices (next page)": user_invoices_query(1, {"cursor": sample_cursor}).limit(DEFAULT_PAGE_SIZE + 1),
+            "list invoices (date range)": user_invoices_query(1, {"date_from": "2024-01-01", "date_to": "2024-12-31"}),
+            "single invoice": Invoice.query.filter_by(id=1, user_id=1),
+            "invoice by number": apply_keyset(Invoice.query.filter_by(user_id=1, invoice_number="INV-1"), None),
+            "duplicate number check": Invoice.query.filter_by(invoice_number="INV-1"),
+            "invoice version (conditional GET)": db.session.query(Invoice.version).filter_by(id=1, user_id=1),
+            "invoice search": search_query(1, "INV-1"),
+            "invoice search (short query)": search_query(1, "IN"),
+        }
+
+        if dialect == "sqlite":
+            explain = "EXPLAIN QUERY PLAN "
+            full_scan = re.compile(r"\bSCAN (TABLE )?invoice\b(?!.*\bUSING\b)")
+        elif dialect == "postgresql":
+            # Small dev tables make the planner prefer seq scans; ask for the indexed plan
+            db.session.execute(db.text("SET enable_seqscan = off"))
+            explain = "EXPLAIN "
+            full_scan = re.compile(r"Seq Scan on invoice\b")
+        else:
+            raise click.ClickException(f"Query plan check is not supported for {dialect}")
+
+        failures = []
+        for name, query in hot_queries.items():
+            sql = str(query.statement.compile(dialect=db.engine.dialect,
+                                              compile_kwargs={"literal_binds": True}))
+            plan = [str(row[-1]) for row in db.session.execute(db.text(explain + sql))]
+            scans = [line for line in plan if full_scan.search(line)]
+            print(("FAIL " if scans else "ok   ") + name)
+            for line in plan:
+                print("       " + line)
+            if scans:
+                failures.append(name)
+
+        db.session.rollback()
+        if failures:
+            raise click.ClickException("Full table scan in: " + ", ".join(failures))
+        print("All hot queries use an index")
+
+    """
+    Imports invoices for one user from a JSON array, NDJSON or CSV file:
+    $ flask import-invoices invoices.csv --email test_user1@test.com
+    """
+    @app.cli.command("import-invoices")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--email", required=True, help="Owner of the imported invoices")
+    @click.option("--format", "fmt", type=click.Choice(["json", "ndjson", "csv"]), default=None,
+                  help="Input format, guessed from the file extension by default")
+    @click.option("--chunk-size", default=DEFAULT_CHUNK_SIZE, type=click.IntRange(min=1), show_default=True)
+    def import_invoices_command(path, email, fmt, chunk_size):
+        user = User.query.filter_by(email=email).first()
+        if not user:
+            raise click.ClickException(f"User not found: {email}")
+        fmt = fmt or format_for(filename=path)
+
+        with open(path, "rb") as stream:
+            report = import_invoices(iter_rows(stream, fmt), user.id, chunk_size=chunk_size)
+
+        for error in report.errors:
+            print(f"Row {error['row']}: {error['message']}")
+        if report.failed > len(report.errors):
+            print(f"... and {report.failed - len(report.errors)} more errors")
+        print(f"Imported {report.inserted} of {report.received} invoices for {email}")
+
+    """
+    Recomputes the per-user invoice summaries from the invoice table, e.g. after
+    loading invoices with raw SQL: $ flask rebuild-invoice-summaries
+    """
+    @app.cli.command("rebuild-invoice-summaries")
+    def rebuild_invoice_summaries():
+        count = rebuild_summaries()
+        print(f"Rebuilt {count} summary rows")
+
+    """
+    Writes one user's invoices straight to a file, without the background job queue:
+    $ flask export-invoices invoices.csv.gz --email test_user1@test.com --date-from 2024-01-01
+    """
+    @app.cli.command("export-invoices")
+    @click.argument("path", type=click.Path(dir_okay=False, writable=True))
+    @click.option("--email", required=True, help="Owner of the exported invoices")
+    @click.option("--format", "fmt", type=click.Choice(list(EXPORT_FORMATS)), default=None,
+                  help="Output format, guessed from the file extension by default")
+    @click.option("--date-from", default=None, help="YYYY-MM-DD, inclusive")
+    @click.option("--date-to", default=None, help="YYYY-MM-DD, inclusive")
+    @click.option("--currency", default=None)
+    @click.option("--batch-size", default=app.config["EXPORT_BATCH_SIZE"], show_default=True)
+    def export_invoices_command(path, email, fmt, date_from, date_to, currency, batch_size):
+        user = User.query.filter_by(email=email).first()
+        if not user:
+            raise click.ClickException(f"User not found: {email}")
+        filters = {"date_from": date_from, "date_to": date_to, "currency": currency}
+        try:
+            fmt = check_format(fmt or format_for_path(path))
+            count = write_export(export_query(user.id, filters), fmt, path, batch_size)
+        except APIException as e:
+            raise click.ClickException(e.message)
+        print(f"Exported {count} invoices for {email} to {path}")
+
+    """
+    Writes .gz (and .br with brotli installed) siblings of the front-end build for
+    the static file server to send as-is; run after `npm run build`: $ flask compress-assets
+    """
+    @app.cli.command("compress-assets")
+    def compress_assets():
+        assets = app.extensions["assets"]
+        count = precompress(assets.directory, app.config["ASSETS_PRECOMPRESS_MIN_SIZE"])
+        print(f"Wrote {count} precompressed files in {assets.directory}")
@@ -0,0 +1,103 @@
+# src/api/compression.py - gzip/brotli response compression negotiated from Accept-Encoding
+import gzip
+import os
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+DEFAULTS = {
+    "COMPRESS_MIN_SIZE": 1024,          # bytes; smaller bodies are not worth the CPU
+    "COMPRESS_GZIP_LEVEL": 6,
+    "COMPRESS_BROTLI_QUALITY": 4,       # dynamic content: fast levels compress nearly as well
+}
+
+COMPRESSIBLE = ("application/json", "application/x-ndjson", "application/javascript",
+                "text/html", "text/css", "text/plain", "text/csv", "image/svg+xml")
+
+
+def _gzip_stream(chunks, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _brotli_stream(chunks, quality):
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in chunks:
+        data = compressor.process(chunk.encode() if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class Compression:
+    """Compresses responses above COMPRESS_MIN_SIZE for clients that accept it.
+
+    Buffered bodies are compressed in one call; streamed ones (NDJSON exports)
+    are wrapped in an incremental compressor. A compressed response's ETag is
+    weakened, since its bytes differ from the identity encoding, which keeps
+    If-None-Match working through api/etags.py's weak comparison.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, value in DEFAULTS.items():
+            app.config.setdefault(key, type(value)(os.getenv(key, value)))
+        self.min_size = app.config["COMPRESS_MIN_SIZE"]
+        self.gzip_level = app.config["COMPRESS_GZIP_LEVEL"]
+        self.brotli_quality = app.config["COMPRESS_BROTLI_QUALITY"]
+        self.encodings = ["br", "gzip"] if brotli is not None else ["gzip"]
+        app.after_request(self.compress)
+        app.extensions["compression"] = self
+
+    def _choose(self):
+        accepted = request.accept_encodings
+        best = max(self.encodings, key=lambda enc: accepted[enc])
+        return best if accepted[best] > 0 else None
+
+    def compress(self, response):
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough
+                or "Content-Encoding" in response.headers
+                or response.mimetype not in COMPRESSIBLE):
+            return response
+        response.vary.add("Accept-Encoding")
+
+        if response.is_streamed:
+            encoding = self._choose()
+            if encoding is None:
+                return response
+            if encoding == "br":
+                response.response = _brotli_stream(response.response, self.brotli_quality)
+            else:
+                response.response = _gzip_stream(response.response, self.gzip_level)
+            response.headers.pop("Content-Length", None)
+        else:
+            if response.content_length is not None and response.content_length < self.min_size:
+                return response
+            encoding = self._choose()
+            if encoding is None:
+                return response
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            if encoding == "br":
+                response.set_data(brotli.compress(data, quality=self.brotli_quality))
+            else:
+                response.set_data(gzip.compress(data, compresslevel=self.gzip_level, mtime=0))
+
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
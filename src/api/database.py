@@ -0,0 +1,190 @@
+# src/api/database.py - Engine configuration: URI and pool settings from the environment, SQLite tuning
+import json
+import os
+import sqlite3
+import threading
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+try:
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+except ImportError:  # needs greenlet; only the ASGI entry point uses it
+    create_async_engine = None
+
+DEFAULT_DATABASE_URL = "sqlite:///invoice_app.db"
+
+SQLITE_DEFAULTS = {
+    "SQLITE_JOURNAL_MODE": "WAL",
+    "SQLITE_SYNCHRONOUS": "NORMAL",
+    "SQLITE_BUSY_TIMEOUT_MS": 5000,
+    "SQLITE_MMAP_SIZE": 256 * 1024 * 1024,
+}
+
+POOL_DEFAULTS = {
+    "DB_POOL_SIZE": 5,
+    "DB_MAX_OVERFLOW": 10,
+    "DB_POOL_TIMEOUT": 30,
+    "DB_POOL_RECYCLE": 1800,
+}
+
+SCHEMA_DEFAULTS = {
+    "DB_CREATE_ALL": "lazy",    # lazy (before the first request) | startup | off (migrations only)
+}
+
+_sqlite_pragmas = []
+
+
+def database_url():
+    url = os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL)
+    # Heroku/Render style URLs; SQLAlchemy 1.4 only accepts "postgresql://"
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def _setting(defaults, key):
+    value = defaults[key]
+    return type(value)(os.getenv(key, value))
+
+
+def engine_options(url):
+    """SQLALCHEMY_ENGINE_OPTIONS for `url`; JSON in the env var of that name overrides them."""
+    if url.startswith("sqlite"):
+        options = {
+            # sqlite3's own wait on a locked database, in seconds
+            "connect_args": {"timeout": _setting(SQLITE_DEFAULTS, "SQLITE_BUSY_TIMEOUT_MS") / 1000},
+        }
+    else:
+        options = {
+            "poolclass": QueuePool,
+            "pool_size": _setting(POOL_DEFAULTS, "DB_POOL_SIZE"),
+            "max_overflow": _setting(POOL_DEFAULTS, "DB_MAX_OVERFLOW"),
+            "pool_timeout": _setting(POOL_DEFAULTS, "DB_POOL_TIMEOUT"),
+            "pool_recycle": _setting(POOL_DEFAULTS, "DB_POOL_RECYCLE"),
+            "pool_pre_ping": True,
+        }
+    overrides = os.getenv("SQLALCHEMY_ENGINE_OPTIONS")
+    if overrides:
+        options.update(json.loads(overrides))
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    _run_pragmas(dbapi_connection)
+
+
+def _run_pragmas(dbapi_connection):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in _sqlite_pragmas:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+def configure_database(app):
+    """Fill in the SQLAlchemy settings on `app` before db.init_app(app)."""
+    url = database_url()
+    app.config.setdefault("SQLALCHEMY_DATABASE_URI", url)
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(url))
+    app.config.setdefault("SQLALCHEMY_TRACK_MODIFICATIONS", False)
+
+    # WAL lets readers proceed while one worker writes; NORMAL sync is safe in WAL mode
+    _sqlite_pragmas[:] = [
+        "PRAGMA journal_mode={}".format(_setting(SQLITE_DEFAULTS, "SQLITE_JOURNAL_MODE")),
+        "PRAGMA synchronous={}".format(_setting(SQLITE_DEFAULTS, "SQLITE_SYNCHRONOUS")),
+        "PRAGMA busy_timeout={:d}".format(_setting(SQLITE_DEFAULTS, "SQLITE_BUSY_TIMEOUT_MS")),
+        "PRAGMA mmap_size={:d}".format(_setting(SQLITE_DEFAULTS, "SQLITE_MMAP_SIZE")),
+    ]
+    if not event.contains(Engine, "connect", _set_sqlite_pragmas):
+        event.listen(Engine, "connect", _set_sqlite_pragmas)
+
+
+def prepare_schema(app, db):
+    """Create missing tables according to DB_CREATE_ALL.
+
+    create_all inspects every table, which is most of the import-time cost on
+    a cold start; "lazy" moves it to the first request of the process.
+    """
+    mode = app.config.setdefault("DB_CREATE_ALL", _setting(SCHEMA_DEFAULTS, "DB_CREATE_ALL"))
+    if mode == "startup":
+        with app.app_context():
+            db.create_all()
+    elif mode == "lazy":
+        lock = threading.Lock()
+        pending = [True]
+
+        @app.before_request
+        def create_tables():
+            if pending:
+                with lock:
+                    if pending:
+                        db.create_all()
+                        pending.clear()
+    elif mode != "off":
+        raise ValueError(f"Unknown DB_CREATE_ALL: {mode}")
+
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def async_database_url(url):
+    """The same database through its asyncio driver (aiosqlite or asyncpg)."""
+    scheme, rest = url.split("://", 1)
+    driver = ASYNC_DRIVERS.get(scheme.split("+", 1)[0])
+    if driver is None:
+        raise ValueError(f"No async driver configured for {scheme}")
+    return f"{driver}://{rest}"
+
+
+def make_async_engine(app):
+    """AsyncEngine for app's database, with the same pool settings and SQLite PRAGMAs."""
+    if create_async_engine is None:
+        raise RuntimeError("The async engine needs SQLAlchemy's asyncio extension (pip install greenlet)")
+    url = app.config["SQLALCHEMY_DATABASE_URI"]
+    options = dict(app.config["SQLALCHEMY_ENGINE_OPTIONS"])
+    if options.get("poolclass") is QueuePool:
+        options["poolclass"] = AsyncAdaptedQueuePool
+    elif url.startswith("sqlite") and ":memory:" not in url and "poolclass" not in options:
+        # SQLAlchemy 1.4 defaults file databases to NullPool, and every new
+        # aiosqlite connection starts a thread; keep a pool of them instead
+        options.update(poolclass=AsyncAdaptedQueuePool,
+                       pool_size=_setting(POOL_DEFAULTS, "DB_POOL_SIZE"),
+                       max_overflow=_setting(POOL_DEFAULTS, "DB_MAX_OVERFLOW"),
+                       pool_timeout=_setting(POOL_DEFAULTS, "DB_POOL_TIMEOUT"))
+    engine = create_async_engine(async_database_url(url), **options)
+    if url.startswith("sqlite"):
+        # aiosqlite connections are adapters, so the global sqlite3 listener skips them
+        event.listen(engine.sync_engine, "connect", lambda conn, record: _run_pragmas(conn))
+    return engine
+
+
+def pool_status(db):
+    """Connectivity and pool usage for the health check."""
+    engine = db.engine
+    pool = engine.pool
+    status = {"dialect": engine.dialect.name, "pool": type(pool).__name__}
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        status["reachable"] = True
+    except Exception as e:
+        status["reachable"] = False
+        status["error"] = type(e).__name__
+        return status
+
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        checked_out = pool.checkedout()
+        status.update({
+            "size": pool.size(),
+            "checked_out": checked_out,
+            "overflow": max(pool.overflow(), 0),
+            "capacity": capacity,
+            "saturation": round(checked_out / capacity, 3) if capacity else 1.0,
+        })
+    return status
@@ -0,0 +1,67 @@
+# src/api/etags.py - Version-based ETags and conditional GET for users and invoices
+import hashlib
+from flask import request
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from .models import db, Invoice, User
+
+user_table = User.__table__
+
+# Bump when the JSON shape of these resources changes so clients do not keep stale bodies
+REPRESENTATION = "2"
+
+
+def make_etag(*parts):
+    return "-".join(str(part) for part in (REPRESENTATION,) + parts)
+
+
+def query_etag(*parts):
+    """ETag for a collection view: the version plus a digest of what selects and shapes the body."""
+    args = sorted(request.args.items(multi=True))
+    digest = hashlib.blake2b(repr((args, request.accept_mimetypes.best)).encode(), digest_size=8).hexdigest()
+    return make_etag(*parts, digest)
+
+
+def not_modified(etag):
+    return request.if_none_match.contains_weak(etag)
+
+
+def conditional(response, etag):
+    """Attach `etag` to a (body, status) tuple or Response; clients revalidate instead of reusing blindly."""
+    body = response[0] if isinstance(response, tuple) else response
+    body.set_etag(etag)
+    body.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def user_versions(user_id):
+    """(version, invoices_version) for one user: a primary-key read of two integers."""
+    return db.session.query(User.version, User.invoices_version).filter(User.id == user_id).first()
+
+
+def invoice_version(invoice_id, user_id):
+    # An index-only scan of ix_invoice_user_id_id_version on PostgreSQL; on
+    # SQLite the rowid probe already lands on the row without a second lookup
+    return (db.session.query(Invoice.version)
+            .filter(Invoice.user_id == user_id, Invoice.id == invoice_id).scalar())
+
+
+def bump_invoice_versions(conn, user_ids):
+    """Advance the collection version of every user whose invoices changed."""
+    user_ids = sorted(set(user_ids))
+    if user_ids:
+        conn.execute(user_table.update().where(user_table.c.id.in_(user_ids))
+                     .values(invoices_version=user_table.c.invoices_version + 1))
+
+
+@event.listens_for(Session, "after_flush")
+def _track_invoice_versions(session, flush_context):
+    user_ids = set()
+    dirty = [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    for obj in list(session.new) + dirty + list(session.deleted):
+        if isinstance(obj, Invoice):
+            if obj.user_id is not None:
+                user_ids.add(obj.user_id)
+            # Moving an invoice between users changes both collections
+            user_ids.update(uid for uid in inspect(obj).attrs.user_id.history.deleted if uid is not None)
+    bump_invoice_versions(session.connection(), user_ids)
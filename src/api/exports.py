@@ -0,0 +1,245 @@
+# src/api/exports.py - Background invoice exports to CSV, gzipped CSV or Parquet files
+import csv
+import gzip
+import json
+import logging
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import islice
+from .models import db, ExportJob, Invoice
+from .utils import APIException
+from .invoice_query import INVOICE_COLUMNS, apply_invoice_filters, parse_filter_object
+from .money import format_minor
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pyarrow is optional; only Parquet exports need it
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "EXPORT_DIR": os.path.join(tempfile.gettempdir(), "invoice_exports"),
+    "EXPORT_WORKERS": 2,
+    "EXPORT_BATCH_SIZE": 5000,          # rows per yield_per batch and per Parquet row group
+    "EXPORT_MAX_ACTIVE_PER_USER": 2,
+    "EXPORT_RETENTION_HOURS": 24,
+    "EXPORT_LEASE_MINUTES": 30,         # a job not finished by then is treated as abandoned
+}
+
+# format -> (file extension, mimetype)
+FORMATS = {
+    "csv": ("csv", "text/csv"),
+    "csv.gz": ("csv.gz", "application/gzip"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+# export-<job id>.<extension>, plus .part while the job is writing it
+EXPORT_FILE = re.compile(r"^export-(\d+)\.")
+
+# invoice_number, invoice_amount, currency and invoice_date are what the bulk import reads back
+CSV_HEADER = ("id", "invoice_number", "invoice_amount", "amount_minor", "currency", "invoice_date")
+
+
+def check_format(fmt):
+    if fmt not in FORMATS:
+        raise APIException("Unsupported export format. Use one of: " + ", ".join(FORMATS))
+    if fmt == "parquet" and pyarrow is None:
+        raise APIException("Parquet exports need pyarrow installed on the server")
+    return fmt
+
+
+def format_for_path(path):
+    for fmt, (extension, _) in sorted(FORMATS.items(), key=lambda item: -len(item[1][0])):
+        if path.endswith("." + extension):
+            return fmt
+    return "csv"
+
+
+def export_query(user_id, filters):
+    """The user's invoices as INVOICE_COLUMNS tuples in id order."""
+    query = db.session.query(*INVOICE_COLUMNS).filter(Invoice.user_id == user_id)
+    return apply_invoice_filters(query, filters).order_by(Invoice.id)
+
+
+def _write_csv(rows, stream):
+    writer = csv.writer(stream)
+    writer.writerow(CSV_HEADER)
+    count = 0
+    for invoice_id, number, amount_minor, currency, invoice_date, _ in rows:
+        writer.writerow((invoice_id, number, format_minor(amount_minor, currency),
+                         amount_minor, currency, invoice_date.isoformat()))
+        count += 1
+    return count
+
+
+def _write_parquet(rows, path, batch_size):
+    schema = pyarrow.schema([
+        ("id", pyarrow.int64()),
+        ("invoice_number", pyarrow.string()),
+        ("amount_minor", pyarrow.int64()),
+        ("currency", pyarrow.string()),
+        ("invoice_date", pyarrow.date32()),
+    ])
+    count = 0
+    with pyarrow.parquet.ParquetWriter(path, schema, compression="zstd") as writer:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            columns = list(zip(*batch))[:len(schema)]
+            writer.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema))
+            count += len(batch)
+    return count
+
+
+def write_export(query, fmt, path, batch_size):
+    """Stream `query` into a file at `path` in `fmt`; returns the number of rows.
+
+    Rows are fetched with yield_per, so memory stays at one batch whatever
+    the size of the export.
+    """
+    rows = iter(query.yield_per(batch_size))
+    if fmt == "parquet":
+        return _write_parquet(rows, path, batch_size)
+    if fmt == "csv.gz":
+        with gzip.open(path, "wt", compresslevel=6, encoding="utf-8", newline="") as stream:
+            return _write_csv(rows, stream)
+    with open(path, "w", encoding="utf-8", newline="") as stream:
+        return _write_csv(rows, stream)
+
+
+class Exports:
+    """Runs export jobs on a small thread pool in the web process, no broker needed.
+
+    Job state is kept in the export_job table, so any worker can report status
+    or serve the file as long as EXPORT_DIR is shared between them. When a new
+    job is started, jobs still pending or running after EXPORT_LEASE_MINUTES
+    are marked failed (their worker died or was restarted, and nothing else
+    would ever finish them), so they stop counting towards
+    EXPORT_MAX_ACTIVE_PER_USER; jobs older than EXPORT_RETENTION_HOURS are
+    removed, row and file.
+    """
+
+    def __init__(self, app=None):
+        self.executor = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, value in DEFAULTS.items():
+            app.config.setdefault(key, type(value)(os.getenv(key, value)))
+        self.app = app
+        self.directory = app.config["EXPORT_DIR"]
+        self.batch_size = app.config["EXPORT_BATCH_SIZE"]
+        self.max_active = app.config["EXPORT_MAX_ACTIVE_PER_USER"]
+        self.retention = timedelta(hours=app.config["EXPORT_RETENTION_HOURS"])
+        self.lease = timedelta(minutes=app.config["EXPORT_LEASE_MINUTES"])
+        self.executor = ThreadPoolExecutor(max_workers=app.config["EXPORT_WORKERS"],
+                                           thread_name_prefix="invoice-export")
+        app.extensions["exports"] = self
+
+    def path(self, job):
+        return os.path.join(self.directory, f"export-{job.id}.{FORMATS[job.format][0]}")
+
+    def submit(self, user_id, fmt, filters):
+        check_format(fmt)
+        # Invalid filters fail the request now rather than the job later
+        export_query(user_id, parse_filter_object(filters))
+        self.fail_abandoned()
+        self.purge_expired()
+
+        active = ExportJob.query.filter(ExportJob.user_id == user_id,
+                                        ExportJob.status.in_(("pending", "running"))).count()
+        if active >= self.max_active:
+            raise APIException("Too many exports in progress, try again when one finishes", status_code=429)
+
+        job = ExportJob(user_id=user_id, format=fmt, filters=json.dumps(filters))
+        db.session.add(job)
+        db.session.commit()
+        self.executor.submit(self._run, job.id)
+        logger.info("Export %s queued for user id=%s (%s)", job.id, user_id, fmt)
+        return job
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            job = ExportJob.query.get(job_id)
+            job.status = "running"
+            db.session.commit()
+
+            path = self.path(job)
+            partial = path + ".part"
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                count = write_export(export_query(job.user_id, json.loads(job.filters)),
+                                     job.format, partial, self.batch_size)
+                os.replace(partial, path)
+                job.status = "done"
+                job.row_count = count
+                job.size_bytes = os.path.getsize(path)
+                logger.info("Export %s finished: %d rows, %d bytes", job.id, count, job.size_bytes)
+            except Exception:
+                logger.exception("Export %s failed", job_id)
+                db.session.rollback()
+                if os.path.exists(partial):
+                    os.remove(partial)
+                job.status = "failed"
+                job.error = "Export failed"
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+
+    def fail_abandoned(self):
+        cutoff = datetime.utcnow() - self.lease
+        abandoned = ExportJob.query.filter(ExportJob.status.in_(("pending", "running")),
+                                           ExportJob.created_at < cutoff).update(
+            {"status": "failed", "error": "Export did not finish in time", "finished_at": datetime.utcnow()},
+            synchronize_session=False)
+        if abandoned:
+            db.session.commit()
+            logger.warning("Marked %d abandoned export job(s) as failed", abandoned)
+        return abandoned
+
+    def purge_expired(self):
+        cutoff = datetime.utcnow() - self.retention
+        expired = ExportJob.query.filter(ExportJob.created_at < cutoff).all()
+        for job in expired:
+            path = self.path(job)
+            if os.path.exists(path):
+                os.remove(path)
+            db.session.delete(job)
+        if expired:
+            db.session.commit()
+        self.remove_orphans()
+
+    def remove_orphans(self):
+        """Delete export files whose job row is gone (deleted with its user); returns how many.
+
+        A row is always committed before its file is written, so a file
+        without one can never be downloaded again.
+        """
+        files = {}
+        for name in os.listdir(self.directory) if os.path.isdir(self.directory) else ():
+            match = EXPORT_FILE.match(name)
+            if match:
+                files.setdefault(int(match.group(1)), []).append(name)
+        if not files:
+            return 0
+        known = {job_id for (job_id,) in db.session.query(ExportJob.id).filter(ExportJob.id.in_(files))}
+        removed = 0
+        for job_id, names in files.items():
+            if job_id not in known:
+                for name in names:
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                        removed += 1
+                    except FileNotFoundError:
+                        pass  # removed by another worker's sweep
+        if removed:
+            logger.info("Removed %d export file(s) without a job", removed)
+        return removed
@@ -0,0 +1,185 @@
+# src/api/idempotency.py - Idempotency-Key support: one execution per key, retries replay the stored response
+import functools
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from flask import Response, current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from .models import db, IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "IDEMPOTENCY_TTL_HOURS": 24,            # how long a stored response is replayed
+    "IDEMPOTENCY_LOCK_SECONDS": 60,         # after this a claim whose request never finished is retried
+    "IDEMPOTENCY_PURGE_EVERY": 100,         # claims per process between deletes of expired keys
+}
+
+MAX_KEY_LENGTH = 255
+READ_SIZE = 64 * 1024
+SPOOL_MAX_MEMORY = 1024 * 1024
+# Outcomes a retry should run again rather than replay: server errors, conflicts
+# with concurrent writes, rate limits and "busy" answers
+NOT_STORED = {409, 429}
+
+key_table = IdempotencyKey.__table__
+c = key_table.c
+
+
+class Idempotency:
+    """Settings and housekeeping for the @idempotent() decorator below.
+
+    Keys live in the idempotency_key table, so every worker sees them; a
+    lookup is one primary-key read. Expired keys are deleted in one indexed
+    statement every IDEMPOTENCY_PURGE_EVERY claims.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, value in DEFAULTS.items():
+            app.config.setdefault(key, type(value)(os.getenv(key, value)))
+        self.ttl = timedelta(hours=app.config["IDEMPOTENCY_TTL_HOURS"])
+        self.lock = timedelta(seconds=app.config["IDEMPOTENCY_LOCK_SECONDS"])
+        self.purge_every = app.config["IDEMPOTENCY_PURGE_EVERY"]
+        self._claims = 0
+        self._counter_lock = threading.Lock()
+        app.extensions["idempotency"] = self
+
+    def should_purge(self):
+        with self._counter_lock:
+            self._claims += 1
+            return self.purge_every > 0 and self._claims % self.purge_every == 0
+
+
+def purge_expired(now=None):
+    result = db.session.execute(key_table.delete().where(c.expires_at < (now or datetime.utcnow())))
+    db.session.commit()
+    return result.rowcount
+
+
+def _fingerprint():
+    """Digest of method, path, query, content type and body.
+
+    The body is read once into a spooled file (memory up to 1 MiB, then disk)
+    and put back as wsgi.input, so views that stream it, like the bulk
+    import, still can.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (request.method, request.path, request.query_string.decode("latin-1"), request.mimetype):
+        digest.update(part.encode() + b"\0")
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    for chunk in iter(lambda: request.stream.read(READ_SIZE), b""):
+        digest.update(chunk)
+        spool.write(chunk)
+    spool.seek(0)
+    request.environ["wsgi.input"] = spool
+    # Werkzeug caches the wrapped input stream; drop it so the view reads the spool
+    request.__dict__.pop("stream", None)
+    return digest.digest()
+
+
+def _replay(row):
+    logger.debug("Replaying the stored %s response for an Idempotency-Key", row.status_code)
+    response = Response(row.body, status=row.status_code, content_type=row.content_type)
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _existing(key_hash, fingerprint, now):
+    """The answer for a key that is already claimed, or None when it is free (or expired)."""
+    row = db.session.execute(select(c.fingerprint, c.status_code, c.content_type, c.body, c.expires_at)
+                             .where(c.key_hash == key_hash)).first()
+    db.session.rollback()
+    if row is None or row.expires_at <= now:
+        return None
+    if row.fingerprint != fingerprint:
+        return jsonify({"message": "Idempotency-Key was already used for a different request"}), 422
+    if row.status_code is None:
+        return _in_progress()
+    return _replay(row)
+
+
+def _in_progress():
+    return jsonify({"message": "A request with this Idempotency-Key is still in progress"}), 409, {"Retry-After": "1"}
+
+
+def _claim(key_hash, fingerprint, now, lock):
+    """Insert the in-progress row; False if another request holds the key."""
+    try:
+        db.session.execute(key_table.delete().where(c.key_hash == key_hash, c.expires_at <= now))
+        db.session.execute(key_table.insert().values(key_hash=key_hash, fingerprint=fingerprint,
+                                                     expires_at=now + lock))
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        return False
+
+
+def _release(key_hash):
+    db.session.rollback()
+    db.session.execute(key_table.delete().where(c.key_hash == key_hash, c.status_code.is_(None)))
+    db.session.commit()
+
+
+def idempotent(per_user=True):
+    """Honour an Idempotency-Key header on a view's mutating requests.
+
+    The first request with a key runs the view and its response is stored;
+    retries with the same key and the same request get that response back
+    without running the view again. The same key on a different request is
+    a 422, and a retry that arrives while the first one runs gets a 409. 5xx,
+    409 and 429 answers are not stored, so those requests are retried for
+    real. Keys are scoped to the JWT identity, or global with per_user=False
+    (registration, where clients should send random UUIDs). Requests without
+    the header are not affected.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get("Idempotency-Key")
+            if key is None or request.method in ("GET", "HEAD", "OPTIONS"):
+                return view(*args, **kwargs)
+            if not 0 < len(key) <= MAX_KEY_LENGTH or not key.isprintable() or not key.isascii():
+                return jsonify({"message": f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} printable ASCII characters"}), 400
+
+            settings = current_app.extensions["idempotency"]
+            scope = get_jwt_identity() if per_user else ""
+            key_hash = hashlib.sha256(f"{scope}\0{request.endpoint}\0{key}".encode()).digest()
+            fingerprint = _fingerprint()
+            now = datetime.utcnow()
+
+            answer = _existing(key_hash, fingerprint, now)
+            if answer is not None:
+                return answer
+            if settings.should_purge():
+                purge_expired(now)
+            if not _claim(key_hash, fingerprint, now, settings.lock):
+                # Lost the race to a concurrent request with the same key
+                return _existing(key_hash, fingerprint, now) or _in_progress()
+
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+            except BaseException:
+                _release(key_hash)
+                raise
+            if response.status_code >= 500 or response.status_code in NOT_STORED or response.is_streamed:
+                _release(key_hash)
+                return response
+
+            db.session.rollback()
+            db.session.execute(key_table.update().where(c.key_hash == key_hash).values(
+                status_code=response.status_code, content_type=response.content_type,
+                body=response.get_data(), expires_at=datetime.utcnow() + settings.ttl))
+            db.session.commit()
+            return response
+        return wrapper
+    return decorator
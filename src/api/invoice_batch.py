@@ -0,0 +1,143 @@
+# src/api/invoice_batch.py - Set-based updates and deletes over many of a user's invoices
+from sqlalchemy import func, select
+from sqlalchemy.orm.exc import StaleDataError
+from .models import db, Invoice
+from .utils import APIException
+from .summaries import apply_changes
+from .etags import bump_invoice_versions
+from .invoice_query import apply_invoice_filters, parse_date, parse_filter_object, FILTER_FIELDS
+from .money import to_minor
+
+MAX_BATCH_IDS = 10000
+UPDATE_FIELDS = ('invoice_amount', 'invoice_date')
+
+invoice_table = Invoice.__table__
+c = invoice_table.c
+
+
+def batch_scope(user_id, data):
+    """WHERE clause for the caller's invoices named by `ids` or matched by `filter`.
+
+    `filter` takes the same fields as the GET /api/invoices query string and
+    must set at least one of them; an empty filter is refused rather than
+    treated as "every invoice", and so are amount bounds without a currency.
+    """
+    ids, filters = data.get('ids'), data.get('filter')
+    if (ids is None) == (filters is None):
+        raise APIException("Provide either ids or filter")
+    stmt = select(Invoice.id).filter(Invoice.user_id == user_id)
+
+    if ids is not None:
+        if not isinstance(ids, list) or not ids:
+            raise APIException("ids must be a non-empty list")
+        if len(ids) > MAX_BATCH_IDS:
+            raise APIException(f"At most {MAX_BATCH_IDS} ids per request")
+        if not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            raise APIException("ids must be integers")
+        return stmt.filter(Invoice.id.in_(sorted(set(ids)))).whereclause
+
+    parse_filter_object(filters)
+    if all(filters.get(field) in (None, '') for field in FILTER_FIELDS):
+        raise APIException("filter needs at least one condition")
+    # Checked here as well as in apply_invoice_filters: a destructive statement
+    # must never compare one currency's minor units against another's
+    if (filters.get('amount_min') not in (None, '') or filters.get('amount_max') not in (None, '')) \
+            and not filters.get('currency'):
+        raise APIException("filter amount_min and amount_max need a currency")
+    return apply_invoice_filters(stmt, filters).whereclause
+
+
+def _parse_changes(changes):
+    if not isinstance(changes, dict) or not changes:
+        raise APIException("set must name at least one of: " + ", ".join(UPDATE_FIELDS))
+    unknown = sorted(set(changes) - set(UPDATE_FIELDS))
+    if unknown:
+        raise APIException(f"Field cannot be changed in bulk: {unknown[0]}")
+    values = {}
+    if 'invoice_date' in changes:
+        values['invoice_date'] = parse_date(changes['invoice_date'], 'invoice_date')
+    return values
+
+
+def _amounts(amount, currencies):
+    # The same amount means different minor units per currency (JPY has no cents)
+    try:
+        return {currency: to_minor(amount, currency) for currency in currencies}
+    except ValueError as e:
+        raise APIException(str(e))
+
+
+def _count(where):
+    return db.session.execute(select(func.count()).select_from(invoice_table).where(where)).scalar()
+
+
+def _lock_and_load(user_id, where):
+    """Take the write lock, then read the rows the statement will touch.
+
+    Bumping invoices_version first is a write, so SQLite holds its write lock
+    from here to the commit and PostgreSQL holds the user row, which every
+    other invoice write for this user also updates. The rows read next are
+    therefore exactly the rows the UPDATE/DELETE will change.
+    """
+    conn = db.session.connection()
+    bump_invoice_versions(conn, [user_id])
+    return conn.execute(select(c.id, c.user_id, c.currency, c.invoice_date, c.amount_minor)
+                        .where(where).with_for_update()).all()
+
+
+def _check(changed, rows):
+    if changed != len(rows):
+        raise StaleDataError(f"Batch matched {len(rows)} invoices but changed {changed}")
+
+
+def delete_invoices(user_id, where, dry_run=False):
+    """Delete the matched invoices in one statement; returns how many matched."""
+    if dry_run:
+        return _count(where)
+    rows = _lock_and_load(user_id, where)
+    if rows:
+        conn = db.session.connection()
+        _check(conn.execute(invoice_table.delete().where(where)).rowcount, rows)
+        apply_changes(conn, removed=[tuple(row[1:]) for row in rows])
+    db.session.commit()
+    return len(rows)
+
+
+def update_invoices(user_id, where, changes, dry_run=False):
+    """Apply `changes` (invoice_amount, invoice_date) to the matched invoices.
+
+    One UPDATE per currency in the scope (usually one) sets the new values and
+    advances each row's version, since Core statements bypass version_id_col.
+    """
+    values = _parse_changes(changes)
+    if dry_run:
+        if 'invoice_amount' in changes:
+            currencies = db.session.execute(select(c.currency).where(where).distinct()).scalars()
+            _amounts(changes['invoice_amount'], currencies)
+        return _count(where)
+
+    rows = _lock_and_load(user_id, where)
+    if not rows:
+        db.session.commit()
+        return 0
+    conn = db.session.connection()
+    values['version'] = c.version + 1
+    if 'invoice_amount' in changes:
+        amounts = _amounts(changes['invoice_amount'], sorted({row.currency for row in rows}))
+        changed = sum(conn.execute(invoice_table.update().where(where, c.currency == currency)
+                                   .values(amount_minor=amount, **values)).rowcount
+                      for currency, amount in amounts.items())
+    else:
+        amounts = None
+        changed = conn.execute(invoice_table.update().where(where).values(**values)).rowcount
+    _check(changed, rows)
+
+    new_date = values.get('invoice_date')
+    apply_changes(
+        conn,
+        added=[(row.user_id, row.currency, new_date or row.invoice_date,
+                amounts[row.currency] if amounts else row.amount_minor) for row in rows],
+        removed=[tuple(row[1:]) for row in rows],
+    )
+    db.session.commit()
+    return len(rows)
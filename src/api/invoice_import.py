@@ -0,0 +1,250 @@
+# src/api/invoice_import.py - Streaming bulk import of invoices (JSON array, NDJSON, CSV)
+import csv
+import io
+import json
+from datetime import datetime, date
+from sqlalchemy.exc import IntegrityError
+from .models import db, Invoice
+from .utils import APIException
+from .summaries import apply_changes
+from .etags import bump_invoice_versions
+from .money import parse_currency, to_minor
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+READ_SIZE = 64 * 1024
+# A JSON array element that still does not parse with this much text buffered is refused
+MAX_ITEM_SIZE = 1024 * 1024
+
+FORMATS = {
+    'application/json': 'json',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'text/csv': 'csv',
+}
+
+
+class RowError(ValueError):
+    pass
+
+
+def format_for(mimetype=None, filename=None):
+    """Pick the input format from a content type or a file extension."""
+    if mimetype in FORMATS:
+        return FORMATS[mimetype]
+    if filename:
+        ext = filename.rsplit('.', 1)[-1].lower()
+        if ext in ('json', 'ndjson', 'csv'):
+            return ext
+        if ext == 'jsonl':
+            return 'ndjson'
+    raise APIException("Unsupported format. Send JSON array, NDJSON or CSV", status_code=415)
+
+
+def _iter_json_array(text):
+    """Yield the elements of a top-level JSON array without loading it whole."""
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = text.read(READ_SIZE)
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    def skip_ws():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos].isspace():
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    fill()
+    skip_ws()
+    if buf[pos:pos + 1] != '[':
+        raise APIException("Expected a JSON array of invoices")
+    pos += 1
+    first = True
+    while True:
+        skip_ws()
+        if buf[pos:pos + 1] == ']':
+            return
+        if not first:
+            if buf[pos:pos + 1] != ',':
+                raise APIException("Malformed JSON array")
+            pos += 1
+            skip_ws()
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+                # A number (or true/false/null) ending the buffer may go on in the next read
+                if end < len(buf) or eof:
+                    break
+            except json.JSONDecodeError:
+                # Only a truncated item is worth more input; an invalid one fails
+                # as soon as it cannot be blamed on the read size
+                if eof or len(buf) - pos >= MAX_ITEM_SIZE:
+                    raise APIException("Malformed JSON array")
+            fill()
+        pos = end
+        first = False
+        yield item
+
+
+def _iter_ndjson(text):
+    for line in text:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield RowError("Invalid JSON")
+
+
+def iter_rows(stream, fmt):
+    """Yield (row_number, row) pairs from a binary stream; row may be a RowError."""
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    if fmt == 'json':
+        rows = _iter_json_array(text)
+    elif fmt == 'ndjson':
+        rows = _iter_ndjson(text)
+    elif fmt == 'csv':
+        rows = csv.DictReader(text)
+    else:
+        raise APIException(f"Unsupported format: {fmt}", status_code=415)
+    for number, row in enumerate(rows, start=1):
+        yield number, row
+
+
+def parse_invoice_row(data):
+    """Validate one input row and return the column values for an insert."""
+    if isinstance(data, RowError):
+        raise data
+    if not isinstance(data, dict):
+        raise RowError("Row must be an object")
+
+    invoice_number = data.get('invoice_number')
+    invoice_amount = data.get('invoice_amount')
+    invoice_date = data.get('invoice_date')
+    if not invoice_number or invoice_amount in (None, ''):
+        raise RowError("Invoice number and amount are required")
+    try:
+        currency = parse_currency(data.get('currency'))
+        amount_minor = to_minor(invoice_amount, currency)
+    except ValueError as e:
+        raise RowError(str(e))
+    try:
+        parsed_date = datetime.strptime(invoice_date, '%Y-%m-%d').date() if invoice_date else date.today()
+    except (TypeError, ValueError):
+        raise RowError("Invalid date format. Use YYYY-MM-DD")
+
+    return {
+        "invoice_number": str(invoice_number),
+        "amount_minor": amount_minor,
+        "currency": currency,
+        "invoice_date": parsed_date,
+    }
+
+
+class ImportReport:
+    def __init__(self):
+        self.received = 0
+        self.inserted = 0
+        self.failed = 0
+        self.aborted = False
+        self.errors = []
+
+    def error(self, row_number, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "message": message})
+
+    def to_dict(self):
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "aborted": self.aborted,
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def _summary_row(values):
+    return values["user_id"], values["currency"], values["invoice_date"], values["amount_minor"]
+
+
+def _insert_chunk(chunk, user_id, report):
+    numbers = [values["invoice_number"] for _, values in chunk]
+    existing = {number for (number,) in db.session.query(Invoice.invoice_number)
+                .filter(Invoice.invoice_number.in_(numbers))}
+
+    pending = []
+    seen = set()
+    for row_number, values in chunk:
+        number = values["invoice_number"]
+        if number in existing or number in seen:
+            report.error(row_number, "Invoice number already exists")
+            continue
+        seen.add(number)
+        values["user_id"] = user_id
+        pending.append((row_number, values))
+
+    if not pending:
+        return
+    try:
+        db.session.execute(Invoice.__table__.insert(), [values for _, values in pending])
+        apply_changes(db.session.connection(), added=[_summary_row(values) for _, values in pending])
+        bump_invoice_versions(db.session.connection(), [user_id])
+        db.session.commit()
+        report.inserted += len(pending)
+    except IntegrityError:
+        # A concurrent writer took one of the numbers; fall back to row-by-row
+        db.session.rollback()
+        for row_number, values in pending:
+            try:
+                db.session.execute(Invoice.__table__.insert(), [values])
+                apply_changes(db.session.connection(), added=[_summary_row(values)])
+                bump_invoice_versions(db.session.connection(), [user_id])
+                db.session.commit()
+                report.inserted += 1
+            except IntegrityError:
+                db.session.rollback()
+                report.error(row_number, "Invoice number already exists")
+
+
+def import_invoices(rows, user_id, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Insert invoices from (row_number, row) pairs in chunks of chunk_size.
+
+    Duplicate numbers are detected with one IN query per chunk and every chunk
+    is written with a single executemany and commit.
+    """
+    report = ImportReport()
+    chunk = []
+    try:
+        for row_number, row in rows:
+            report.received += 1
+            try:
+                chunk.append((row_number, parse_invoice_row(row)))
+            except RowError as e:
+                report.error(row_number, str(e))
+                continue
+            if len(chunk) >= chunk_size:
+                _insert_chunk(chunk, user_id, report)
+                chunk = []
+    except APIException as e:
+        # The input became unreadable part way through; keep what was valid so far
+        if not report.received:
+            raise
+        report.error(report.received + 1, e.message)
+        report.aborted = True
+    if chunk:
+        _insert_chunk(chunk, user_id, report)
+    return report
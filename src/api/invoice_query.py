@@ -0,0 +1,172 @@
+# src/api/invoice_query.py - Filtering and keyset pagination for invoice listings
+import base64
+import json
+from datetime import datetime
+from json.encoder import encode_basestring as quote
+from sqlalchemy import and_, or_, select
+from .models import Invoice
+from .utils import APIException
+from .money import parse_currency, to_minor, format_minor
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 1000
+# Query-string filters understood by apply_invoice_filters (also accepted as a JSON "filter" object)
+FILTER_FIELDS = ('date_from', 'date_to', 'currency', 'amount_min', 'amount_max', 'number_prefix')
+
+# Listings read these columns and render them straight to JSON text; the
+# template produces exactly what Invoice.serialize() + jsonify would
+INVOICE_COLUMNS = (Invoice.id, Invoice.invoice_number, Invoice.amount_minor, Invoice.currency,
+                   Invoice.invoice_date, Invoice.user_id)
+ROW_TEMPLATE = ('{"id":%d,"invoice_number":%s,"invoice_amount":"%s","amount_minor":%d,'
+                '"currency":%s,"invoice_date":"%s","user_id":%d}')
+
+
+def parse_date(value, field):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise APIException(f"Invalid {field}. Use YYYY-MM-DD")
+
+
+def parse_amount(value, field, currency):
+    try:
+        return to_minor(value, currency)
+    except ValueError:
+        raise APIException(f"Invalid {field}. Must be a number")
+
+
+def parse_limit(value):
+    if value is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise APIException("Invalid limit. Must be an integer")
+    if limit < 1:
+        raise APIException("Invalid limit. Must be at least 1")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def encode_cursor(invoice):
+    """Opaque cursor pointing just past `invoice` in (invoice_date, id) order."""
+    raw = json.dumps([invoice.invoice_date.isoformat(), invoice.id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date_str, invoice_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.strptime(date_str, '%Y-%m-%d').date(), int(invoice_id)
+    except (TypeError, ValueError):
+        raise APIException("Invalid cursor")
+
+
+def apply_invoice_filters(query, args):
+    """Narrow an Invoice query with the filters supported by the list endpoints.
+
+    Recognised arguments: date_from, date_to (inclusive, YYYY-MM-DD), currency,
+    amount_min, amount_max (inclusive, in units of `currency`, which they
+    require) and number_prefix.
+    """
+    try:
+        currency = parse_currency(args.get('currency'))
+    except ValueError as e:
+        raise APIException(str(e))
+    # 10 means 1000 minor units in USD but 10 in JPY, so a bound needs its currency
+    has_amount = args.get('amount_min') is not None or args.get('amount_max') is not None
+    if has_amount and not args.get('currency'):
+        raise APIException("amount_min and amount_max need a currency")
+    if args.get('currency'):
+        query = query.filter(Invoice.currency == currency)
+    if args.get('date_from'):
+        query = query.filter(Invoice.invoice_date >= parse_date(args['date_from'], 'date_from'))
+    if args.get('date_to'):
+        query = query.filter(Invoice.invoice_date <= parse_date(args['date_to'], 'date_to'))
+    if args.get('amount_min') is not None:
+        query = query.filter(Invoice.amount_minor >= parse_amount(args['amount_min'], 'amount_min', currency))
+    if args.get('amount_max') is not None:
+        query = query.filter(Invoice.amount_minor <= parse_amount(args['amount_max'], 'amount_max', currency))
+    if args.get('number_prefix'):
+        prefix = args['number_prefix']
+        # Range predicate instead of LIKE so the comparison can use an index
+        # and '%'/'_' in the prefix are matched literally.
+        query = query.filter(Invoice.invoice_number >= prefix,
+                             Invoice.invoice_number < prefix + '\uffff')
+    return query
+
+
+def parse_filter_object(filters):
+    """Validate a JSON "filter" object for the batch and export endpoints."""
+    if not isinstance(filters, dict):
+        raise APIException("filter must be an object")
+    unknown = sorted(set(filters) - set(FILTER_FIELDS))
+    if unknown:
+        raise APIException(f"Unknown filter field: {unknown[0]}")
+    return filters
+
+
+def apply_keyset(query, cursor):
+    """Order newest first and resume after `cursor` if one was given."""
+    if cursor:
+        cursor_date, cursor_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            Invoice.invoice_date < cursor_date,
+            and_(Invoice.invoice_date == cursor_date, Invoice.id < cursor_id),
+        ))
+    return query.order_by(Invoice.invoice_date.desc(), Invoice.id.desc())
+
+
+def user_invoices_query(user_id, args):
+    query = Invoice.query.filter(Invoice.user_id == user_id)
+    query = apply_invoice_filters(query, args)
+    return apply_keyset(query, args.get('cursor'))
+
+
+def user_invoices_select(user_id, args):
+    """Core SELECT of INVOICE_COLUMNS with the same filters and order, for the async routes."""
+    stmt = apply_invoice_filters(select(*INVOICE_COLUMNS).filter(Invoice.user_id == user_id), args)
+    return apply_keyset(stmt, args.get('cursor'))
+
+
+def split_page(rows, limit):
+    """(rows, next_cursor) from up to limit + 1 fetched rows."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+
+def fetch_page(query, limit):
+    """Return (rows, next_cursor) reading at most limit + 1 rows."""
+    return split_page(query.limit(limit + 1).all(), limit)
+
+
+def render_row(row):
+    invoice_id, number, amount_minor, currency, invoice_date, user_id = row
+    return ROW_TEMPLATE % (invoice_id, quote(number), format_minor(amount_minor, currency), amount_minor,
+                           quote(currency), invoice_date.isoformat(), user_id)
+
+
+def page_json(rows, next_cursor):
+    return '{"invoices":[%s],"next_cursor":%s}\n' % (
+        ",".join([render_row(row) for row in rows]),
+        quote(next_cursor) if next_cursor else "null")
+
+
+def fetch_page_json(query, limit):
+    """One page of invoices as a JSON document, without ORM objects or per-row dicts."""
+    return page_json(*fetch_page(query.with_entities(*INVOICE_COLUMNS), limit))
+
+
+def iter_ndjson(query):
+    """Yield invoices as NDJSON, loading and sending rows in fixed-size batches."""
+    batch = []
+    for row in query.with_entities(*INVOICE_COLUMNS).yield_per(STREAM_BATCH_SIZE):
+        batch.append(render_row(row))
+        if len(batch) >= STREAM_BATCH_SIZE:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
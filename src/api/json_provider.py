@@ -0,0 +1,69 @@
+# src/api/json_provider.py - orjson-backed Flask JSON provider with a stdlib fallback
+import os
+import logging
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "JSON_ENCODER": "orjson",   # orjson | stdlib
+}
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask's JSON provider with encoding and decoding done by orjson.
+
+    Dates and other non-native types still go through DefaultJSONProvider.default,
+    so the output matches the stdlib provider value for value. Keys are emitted
+    in insertion order (serialize() order) rather than sorted.
+    """
+
+    sort_keys = False
+
+    def _options(self):
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps_bytes(self, obj):
+        return orjson.dumps(obj, default=self.default, option=self._options())
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
+
+
+class StdlibProvider(DefaultJSONProvider):
+    sort_keys = False
+
+    def dumps_bytes(self, obj):
+        return self.dumps(obj).encode()
+
+
+def configure_json(app):
+    app.config.setdefault("JSON_ENCODER", os.getenv("JSON_ENCODER", DEFAULTS["JSON_ENCODER"]))
+    encoder = app.config["JSON_ENCODER"]
+    if encoder == "orjson" and orjson is None:
+        logger.warning("orjson is not installed, falling back to the stdlib JSON encoder")
+        encoder = "stdlib"
+    if encoder not in ("orjson", "stdlib"):
+        raise ValueError(f"Unknown JSON_ENCODER: {encoder}")
+    app.json = OrjsonProvider(app) if encoder == "orjson" else StdlibProvider(app)
@@ -0,0 +1,128 @@
+# src/api/logging_config.py - JSON logging through a background queue with request ids
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import time
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+from flask import g, request, has_request_context
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+DEFAULTS = {
+    "LOG_LEVEL": "INFO",
+    "LOG_LEVELS": "",       # per-logger overrides, e.g. "api.routes=DEBUG,sqlalchemy.engine=WARNING"
+    "LOG_FORMAT": "json",   # json | text
+}
+
+_listener = None
+
+
+class JSONFormatter(logging.Formatter):
+    converter = time.gmtime
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + ".%03dZ" % record.msecs,
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record):
+        record.request_id = getattr(record, "request_id", None) or "-"
+        return super().format(record)
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = g.get("request_id") if has_request_context() else None
+        return True
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Queue handler that leaves all formatting to the listener thread.
+
+    The stock prepare() fully formats the record on the caller's thread; here
+    only the message arguments and traceback are resolved, since those may not
+    be safe to touch later.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+@atexit.register
+def _stop_listener():
+    # Flushes whatever is still queued
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def parse_levels(spec):
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(app):
+    """Route all logging through a non-blocking queue and tag records with the request id."""
+    global _listener
+    for key, value in DEFAULTS.items():
+        app.config.setdefault(key, os.getenv(key, value))
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JSONFormatter() if app.config["LOG_FORMAT"] == "json" else TextFormatter())
+
+    queue_handler = DeferredQueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(app.config["LOG_LEVEL"].upper())
+    for name, level in parse_levels(app.config["LOG_LEVELS"]).items():
+        logging.getLogger(name).setLevel(level)
+
+    # Flask's own logger gets a stderr handler by default; let records reach the root instead
+    app.logger.handlers.clear()
+
+    _stop_listener()
+    _listener = QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+    @app.before_request
+    def assign_request_id():
+        g.request_id = request.headers.get(REQUEST_ID_HEADER, "")[:64] or uuid.uuid4().hex
+
+    @app.after_request
+    def echo_request_id(response):
+        request_id = g.get("request_id")
+        if request_id:
+            response.headers[REQUEST_ID_HEADER] = request_id
+        return response
@@ -0,0 +1,255 @@
+# src/api/metrics.py - Prometheus text-format metrics that aggregate across gunicorn workers
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from flask import Response, g, request, has_request_context
+from sqlalchemy import event
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+FLUSH_INTERVAL = 1.0
+# Totals of workers that have exited, kept next to the live workers' dumps
+EXITED_FILE = "metrics_exited.json"
+
+_registry = []
+_lock = threading.Lock()
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values = {}
+        _registry.append(self)
+
+    def inc(self, *labels, amount=1):
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def snapshot(self):
+        return {json.dumps(labels): value for labels, value in self.values.items()}
+
+    def merge(self, total, snapshot):
+        for key, value in snapshot.items():
+            total[key] = total.get(key, 0) + value
+
+    def render(self, merged):
+        for key, value in sorted(merged.items()):
+            yield f"{self.name}{_labels(self.labelnames, json.loads(key))} {value}"
+
+
+class Histogram(Counter):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    def observe(self, value, *labels):
+        with _lock:
+            state = self.values.get(labels)
+            if state is None:
+                # non-cumulative bucket counts, then sum and count
+                state = self.values[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def snapshot(self):
+        return {json.dumps(labels): list(state) for labels, state in self.values.items()}
+
+    def merge(self, total, snapshot):
+        for key, state in snapshot.items():
+            if key in total:
+                total[key] = [a + b for a, b in zip(total[key], state)]
+            else:
+                total[key] = list(state)
+
+    def render(self, merged):
+        for key, state in sorted(merged.items()):
+            labels = json.loads(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(self.labelnames + ('le',), labels + [repr(float(bound))])} {cumulative}"
+            yield f"{self.name}_bucket{_labels(self.labelnames + ('le',), labels + ['+Inf'])} {state[-1]}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {state[-2]}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {state[-1]}"
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join('{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+                     for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+REQUESTS = Counter("http_requests_total", "HTTP requests by endpoint, method and status",
+                   ("endpoint", "method", "status"))
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Time spent producing the response",
+                            ("endpoint",))
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed", ("endpoint",))
+DB_QUERY_LATENCY = Histogram("db_query_duration_seconds", "SQL statement execution time",
+                             buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1))
+PASSWORD_HASH_LATENCY = Histogram("password_hash_duration_seconds", "Password hash/verify time",
+                                  ("operation",))
+JWT_FAILURES = Counter("jwt_verification_failures_total", "Rejected JWTs by reason", ("reason",))
+RATE_LIMITED = Counter("rate_limited_total", "Requests refused with 429 by scope and limit",
+                       ("scope", "limit"))
+
+
+def _endpoint():
+    if has_request_context() and request.url_rule is not None:
+        return request.url_rule.endpoint
+    return "none"
+
+
+def render_metrics(directory=None):
+    """Exposition text for this process, plus every worker's dump in `directory`."""
+    with _lock:
+        snapshots = [{metric.name: metric.snapshot() for metric in _registry}]
+    if directory:
+        own = _dump_path(directory)
+        for path in glob.glob(os.path.join(directory, "metrics_*.json")):
+            if path == own:
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # a worker is mid-write or the file vanished
+
+    lines = []
+    for metric in _registry:
+        merged = {}
+        for snapshot in snapshots:
+            metric.merge(merged, snapshot.get(metric.name, {}))
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render(merged))
+    return "\n".join(lines) + "\n"
+
+
+def _dump_path(directory):
+    return os.path.join(directory, f"metrics_{os.getpid()}.json")
+
+
+def _write(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def dump_metrics(directory):
+    with _lock:
+        data = {metric.name: metric.snapshot() for metric in _registry}
+    _write(_dump_path(directory), data)
+
+
+def retire_worker(directory, pid):
+    """Fold an exited worker's dump into EXITED_FILE and delete it.
+
+    Run from the gunicorn master (see gunicorn.conf.py) so the directory holds
+    one file per live worker, and a recycled pid starts from zero instead of
+    overwriting the counts its previous owner left behind.
+    """
+    path = os.path.join(directory, f"metrics_{pid}.json")
+    try:
+        with open(path) as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return False
+    except ValueError:
+        snapshot = {}
+    total_path = os.path.join(directory, EXITED_FILE)
+    try:
+        with open(total_path) as f:
+            total = json.load(f)
+    except (OSError, ValueError):
+        total = {}
+    for metric in _registry:
+        merged = total.setdefault(metric.name, {})
+        metric.merge(merged, snapshot.get(metric.name, {}))
+    _write(total_path, total)
+    for leftover in (path, path + ".tmp"):
+        try:
+            os.remove(leftover)
+        except FileNotFoundError:
+            pass
+    return True
+
+
+def retire_all_workers(directory):
+    """Fold every per-worker dump left by a previous run (before any worker starts)."""
+    retired = 0
+    for path in glob.glob(os.path.join(directory, "metrics_*.json")):
+        pid = os.path.basename(path)[len("metrics_"):-len(".json")]
+        if pid.isdigit() and retire_worker(directory, int(pid)):
+            retired += 1
+    return retired
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "metrics_start", None)
+    if start is not None:
+        DB_QUERY_LATENCY.observe(time.perf_counter() - start)
+    DB_QUERIES.inc(_endpoint())
+
+
+def instrument_engine(engine):
+    """Count and time every statement run on `engine` (a sync Engine or an AsyncEngine's sync_engine)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def init_metrics(app, db):
+    """Record request, SQL and auth metrics and serve them on /metrics.
+
+    With several gunicorn workers set METRICS_DIR to a directory shared by all
+    of them: each worker dumps its counters there at most once a second and
+    /metrics adds them up. gunicorn.conf.py folds an exited worker's file into
+    EXITED_FILE; other process managers must call retire_worker() themselves.
+    """
+    directory = app.config.setdefault("METRICS_DIR", os.getenv("METRICS_DIR"))
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        atexit.register(dump_metrics, directory)
+    next_flush = [0.0]
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop("metrics_start", None)
+        if start is not None:
+            endpoint = _endpoint()
+            REQUESTS.inc(endpoint, request.method, str(response.status_code))
+            REQUEST_LATENCY.observe(time.perf_counter() - start, endpoint)
+        if directory and time.monotonic() >= next_flush[0]:
+            next_flush[0] = time.monotonic() + FLUSH_INTERVAL
+            dump_metrics(directory)
+        return response
+
+    with app.app_context():
+        instrument_engine(db.engine)
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(render_metrics(directory), mimetype="text/plain; version=0.0.4")
@@ -1,6 +1,7 @@
 # src/api/models.py - Compatible with SQLAlchemy 1.4
 from flask_sqlalchemy import SQLAlchemy
-from datetime import date
+from datetime import date, datetime
+from .money import DEFAULT_CURRENCY, format_minor
 
 db = SQLAlchemy()
 
@@ -9,12 +10,19 @@ class User(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password = db.Column(db.String(120), nullable=False)
+    # Sized for scrypt/argon2 encodings, which are longer than 120 characters
+    password = db.Column(db.String(255), nullable=False)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
+    # Row version for ETags (bumped by every ORM update) and a counter bumped
+    # whenever any of the user's invoices change, see api/etags.py
+    version = db.Column(db.Integer, nullable=False, default=1)
+    invoices_version = db.Column(db.Integer, nullable=False, default=0)
 
     # Relationship to invoices
     invoices = db.relationship('Invoice', backref='user', lazy=True, cascade="all, delete-orphan")
 
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         return f'<User {self.email}>'
 
@@ -27,12 +35,25 @@ class User(db.Model):
 
 class Invoice(db.Model):
     __tablename__ = "invoice"
+    __table_args__ = (
+        # Serves the per-user listing, keyset pagination and date filters
+        db.Index('ix_invoice_user_id_invoice_date_id', 'user_id', 'invoice_date', 'id'),
+        # Serves per-user lookups by invoice number
+        db.Index('ix_invoice_user_id_invoice_number', 'user_id', 'invoice_number'),
+        # Covers the conditional GET version check (index-only on PostgreSQL)
+        db.Index('ix_invoice_user_id_id_version', 'user_id', 'id', 'version'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     invoice_number = db.Column(db.String(120), unique=True, nullable=False)
-    invoice_amount = db.Column(db.Float, nullable=False)
+    # Integer minor units (cents for USD) so totals reconcile exactly
+    amount_minor = db.Column(db.BigInteger, nullable=False)
+    currency = db.Column(db.String(3), nullable=False, default=DEFAULT_CURRENCY)
     invoice_date = db.Column(db.Date, nullable=False, default=date.today)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=1)
+
+    __mapper_args__ = {"version_id_col": version}
 
     def __repr__(self):
         return f'<Invoice {self.invoice_number}>'
@@ -41,7 +62,84 @@ class Invoice(db.Model):
         return {
             "id": self.id,
             "invoice_number": self.invoice_number,
-            "invoice_amount": self.invoice_amount,
+            "invoice_amount": format_minor(self.amount_minor, self.currency),
+            "amount_minor": self.amount_minor,
+            "currency": self.currency,
             "invoice_date": self.invoice_date.isoformat() if self.invoice_date else None,
             "user_id": self.user_id
-        }
\ No newline at end of file
+        }
+
+class InvoiceSummary(db.Model):
+    """Running totals of a user's invoices per currency and bucket, kept in step by api/summaries.py.
+
+    period_type is "all" (period ""), "year" ("2024") or "month" ("2024-05").
+    Amounts are in minor units of `currency`.
+    """
+    __tablename__ = "invoice_summary"
+
+    # Removed with the user by the database; the ORM never loads these rows to delete them
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete="CASCADE"), primary_key=True)
+    currency = db.Column(db.String(3), primary_key=True)
+    period_type = db.Column(db.String(5), primary_key=True)
+    period = db.Column(db.String(7), primary_key=True)
+    invoice_count = db.Column(db.Integer, nullable=False, default=0)
+    total_minor = db.Column(db.BigInteger, nullable=False, default=0)
+    min_minor = db.Column(db.BigInteger)
+    max_minor = db.Column(db.BigInteger)
+
+    def serialize(self):
+        return {
+            "period": self.period,
+            "count": self.invoice_count,
+            "sum": format_minor(self.total_minor, self.currency),
+            "min": format_minor(self.min_minor, self.currency),
+            "max": format_minor(self.max_minor, self.currency),
+        }
+
+class ExportJob(db.Model):
+    """A background invoice export run by api/exports.py; the file lives in EXPORT_DIR.
+
+    status goes pending -> running -> done | failed. `filters` is the JSON
+    object of list filters the export was started with.
+    """
+    __tablename__ = "export_job"
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Removed with the user by the database (its files stay in EXPORT_DIR, unreachable without the row)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete="CASCADE"), nullable=False, index=True)
+    format = db.Column(db.String(10), nullable=False)
+    filters = db.Column(db.Text, nullable=False, default="{}")
+    status = db.Column(db.String(10), nullable=False, default="pending")
+    row_count = db.Column(db.Integer)
+    size_bytes = db.Column(db.BigInteger)
+    error = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    finished_at = db.Column(db.DateTime)
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "format": self.format,
+            "status": self.status,
+            "row_count": self.row_count,
+            "size_bytes": self.size_bytes,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+class IdempotencyKey(db.Model):
+    """A stored response for an Idempotency-Key, replayed to retries by api/idempotency.py.
+
+    `key_hash` covers the key and who sent it, `fingerprint` the request it
+    was first used with. status_code is NULL while that request is running;
+    expires_at is then a short lease, afterwards the retention deadline.
+    """
+    __tablename__ = "idempotency_key"
+
+    key_hash = db.Column(db.LargeBinary(32), primary_key=True)
+    fingerprint = db.Column(db.LargeBinary(16), nullable=False)
+    status_code = db.Column(db.SmallInteger)
+    content_type = db.Column(db.String(100))
+    body = db.Column(db.LargeBinary)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
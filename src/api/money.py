@@ -0,0 +1,55 @@
+# src/api/money.py - Exact money handling: amounts are stored as integer minor units per currency
+from decimal import Decimal, InvalidOperation
+
+DEFAULT_CURRENCY = "USD"
+
+# ISO 4217 currencies whose minor unit is not 1/100
+CURRENCY_EXPONENTS = {
+    "BIF": 0, "CLP": 0, "DJF": 0, "GNF": 0, "ISK": 0, "JPY": 0, "KMF": 0, "KRW": 0,
+    "PYG": 0, "RWF": 0, "UGX": 0, "VND": 0, "VUV": 0, "XAF": 0, "XOF": 0, "XPF": 0,
+    "BHD": 3, "IQD": 3, "JOD": 3, "KWD": 3, "LYD": 3, "OMR": 3, "TND": 3,
+}
+_SCALES = {exp: 10 ** exp for exp in (0, 2, 3)}
+
+
+def exponent(currency):
+    return CURRENCY_EXPONENTS.get(currency, 2)
+
+
+def parse_currency(value):
+    if value is None or value == "":
+        return DEFAULT_CURRENCY
+    if not isinstance(value, str) or len(value) != 3 or not value.isalpha():
+        raise ValueError("Invalid currency. Use a 3-letter ISO 4217 code")
+    return value.upper()
+
+
+def to_minor(value, currency=DEFAULT_CURRENCY):
+    """Convert a JSON number or decimal string to integer minor units, exactly."""
+    if isinstance(value, bool):
+        raise ValueError("Invalid amount")
+    exp = exponent(currency)
+    if isinstance(value, int):
+        return value * _SCALES[exp]
+    try:
+        # str() of a float is its shortest round-trip form, so 0.1 becomes "0.1"
+        amount = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        raise ValueError("Invalid amount")
+    if not amount.is_finite():
+        raise ValueError("Invalid amount")
+    minor = amount.scaleb(exp)
+    if minor != minor.to_integral_value():
+        raise ValueError(f"Amount has more than {exp} decimal places for {currency}")
+    return int(minor)
+
+
+def format_minor(minor, currency=DEFAULT_CURRENCY):
+    """Render minor units as a plain decimal string using integer arithmetic only."""
+    if minor is None:
+        return None
+    exp = exponent(currency)
+    if exp == 0:
+        return str(minor)
+    whole, frac = divmod(-minor if minor < 0 else minor, _SCALES[exp])
+    return f"{'-' if minor < 0 else ''}{whole}.{frac:0{exp}d}"
@@ -0,0 +1,212 @@
+# src/api/passwords.py - Pluggable password hashing run off the request thread
+import os
+import logging
+import random
+import secrets
+import threading
+import time
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+from .metrics import PASSWORD_HASH_LATENCY
+
+try:
+    from argon2 import PasswordHasher as Argon2Hasher
+    from argon2.exceptions import VerificationError, InvalidHashError
+except ImportError:  # argon2-cffi is optional
+    Argon2Hasher = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "PASSWORD_HASH_METHOD": "scrypt",        # scrypt | argon2 | pbkdf2
+    "PASSWORD_SCRYPT_N": 2 ** 15,
+    "PASSWORD_SCRYPT_R": 8,
+    "PASSWORD_SCRYPT_P": 1,
+    "PASSWORD_PBKDF2_ITERATIONS": 600000,
+    "PASSWORD_ARGON2_TIME_COST": 3,
+    "PASSWORD_ARGON2_MEMORY_COST": 65536,    # KiB
+    "PASSWORD_ARGON2_PARALLELISM": 4,
+    "PASSWORD_HASH_WORKERS": min(4, os.cpu_count() or 1),  # 0 hashes inline
+    "PASSWORD_HASH_MAX_PENDING": 64,
+    "PASSWORD_HASH_TIMEOUT": 10,
+    "PASSWORD_DUMMY_VERIFY_PER_SECOND": 20.0,  # real KDF runs spent on unknown emails
+}
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool queue is full; callers should answer 503."""
+
+
+# --- Functions executed inside the worker processes (must stay picklable) ---
+
+def _argon2(params):
+    return Argon2Hasher(time_cost=params["time_cost"], memory_cost=params["memory_cost"],
+                        parallelism=params["parallelism"])
+
+
+def _hash(scheme, password):
+    kind, params = scheme
+    if kind == "argon2":
+        return _argon2(params).hash(password)
+    return generate_password_hash(password, method=params["method"])
+
+
+def _verify(stored, password):
+    if stored.startswith("$argon2"):
+        if Argon2Hasher is None:
+            raise RuntimeError("argon2 hash found but argon2-cffi is not installed")
+        try:
+            return Argon2Hasher().verify(stored, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    return check_password_hash(stored, password)
+
+
+class PasswordHashing:
+    """Hashes and verifies passwords according to app.config.
+
+    Work is sent to a bounded process pool so the KDF does not hold the GIL of
+    the worker serving requests; PASSWORD_HASH_WORKERS = 0 runs it inline.
+
+    verify(None, password) is the unknown-account path: it checks the password
+    against a dummy hash so the response costs the same as for a real account.
+    Those checks are capped at PASSWORD_DUMMY_VERIFY_PER_SECOND; past the cap
+    the call sleeps for a recently observed real verify time instead, which
+    keeps the timing without spending CPU on requests that cannot succeed.
+    """
+
+    def __init__(self, app=None):
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        self._dummy_hash = None
+        self._verify_times = deque(maxlen=256)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, value in DEFAULTS.items():
+            app.config.setdefault(key, type(value)(os.getenv(key, value)))
+        config = app.config
+
+        method = config["PASSWORD_HASH_METHOD"]
+        if method == "argon2" and Argon2Hasher is None:
+            logger.warning("argon2-cffi is not installed, falling back to scrypt password hashing")
+            method = "scrypt"
+        if method == "argon2":
+            self.scheme = ("argon2", {
+                "time_cost": config["PASSWORD_ARGON2_TIME_COST"],
+                "memory_cost": config["PASSWORD_ARGON2_MEMORY_COST"],
+                "parallelism": config["PASSWORD_ARGON2_PARALLELISM"],
+            })
+        elif method == "pbkdf2":
+            self.scheme = ("werkzeug", {"method": f"pbkdf2:sha256:{config['PASSWORD_PBKDF2_ITERATIONS']}"})
+        elif method == "scrypt":
+            self.scheme = ("werkzeug", {"method": "scrypt:{}:{}:{}".format(
+                config["PASSWORD_SCRYPT_N"], config["PASSWORD_SCRYPT_R"], config["PASSWORD_SCRYPT_P"])})
+        else:
+            raise ValueError(f"Unknown PASSWORD_HASH_METHOD: {method}")
+
+        self.workers = config["PASSWORD_HASH_WORKERS"]
+        self.timeout = config["PASSWORD_HASH_TIMEOUT"]
+        self._slots = threading.BoundedSemaphore(max(1, config["PASSWORD_HASH_MAX_PENDING"]))
+        self.dummy_rate = config["PASSWORD_DUMMY_VERIFY_PER_SECOND"]
+        self._dummy_tokens = self.dummy_rate
+        self._dummy_stamp = time.monotonic()
+        app.extensions["password_hashing"] = self
+
+    def _pool(self):
+        # Pools do not survive fork, so each gunicorn worker builds its own
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HashingBusy()
+        try:
+            return self._pool().submit(fn, *args).result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HashingBusy()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        start = time.perf_counter()
+        try:
+            return self._run(_hash, self.scheme, password)
+        finally:
+            PASSWORD_HASH_LATENCY.observe(time.perf_counter() - start, "hash")
+
+    def verify(self, stored, password):
+        if stored is None:
+            return self._verify_unknown(password)
+        start = time.perf_counter()
+        try:
+            return self._run(_verify, stored, password)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._verify_times.append(elapsed)
+            PASSWORD_HASH_LATENCY.observe(elapsed, "verify")
+
+    def _take_dummy_slot(self):
+        with self._lock:
+            now = time.monotonic()
+            self._dummy_tokens = min(self.dummy_rate, self._dummy_tokens + (now - self._dummy_stamp) * self.dummy_rate)
+            self._dummy_stamp = now
+            if self._dummy_tokens >= 1:
+                self._dummy_tokens -= 1
+                return True
+            return False
+
+    def _verify_unknown(self, password):
+        samples = list(self._verify_times)
+        if samples and not self._take_dummy_slot():
+            time.sleep(random.choice(samples))
+            return False
+        start = time.perf_counter()
+        try:
+            if self._dummy_hash is None:
+                # Hashing costs what verifying does, so building it lazily is not observable
+                self._dummy_hash = self._run(_hash, self.scheme, secrets.token_urlsafe(16))
+            else:
+                self._run(_verify, self._dummy_hash, password)
+            return False
+        finally:
+            PASSWORD_HASH_LATENCY.observe(time.perf_counter() - start, "dummy")
+
+    def needs_rehash(self, stored):
+        kind, params = self.scheme
+        if kind == "argon2":
+            return not stored.startswith("$argon2") or _argon2(params).check_needs_rehash(stored)
+        return stored.split("$", 1)[0] != params["method"]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _hashing():
+    return current_app.extensions["password_hashing"]
+
+
+def hash_password(password):
+    return _hashing().hash(password)
+
+
+def verify_password(stored, password):
+    """Check `password` against `stored`; pass stored=None for an unknown account."""
+    return _hashing().verify(stored, password)
+
+
+def needs_rehash(stored):
+    return _hashing().needs_rehash(stored)
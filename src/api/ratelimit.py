@@ -0,0 +1,248 @@
+# src/api/ratelimit.py - Token-bucket rate limits and failed-login lockouts for the auth endpoints
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from flask import current_app, jsonify, request
+from .metrics import RATE_LIMITED
+from .utils import APIException
+
+DEFAULTS = {
+    "RATELIMIT_ENABLED": 1,
+    "RATELIMIT_STORE": "memory",              # memory | sqlite:///path/to/ratelimit.db
+    "RATELIMIT_IP_BURST": 20,
+    "RATELIMIT_IP_PER_MINUTE": 30,
+    "RATELIMIT_ACCOUNT_BURST": 5,
+    "RATELIMIT_ACCOUNT_PER_MINUTE": 6,
+    "RATELIMIT_LOCKOUT_AFTER": 5,             # failed logins per account before the first lockout
+    "RATELIMIT_IP_LOCKOUT_AFTER": 50,         # failed logins per client address
+    "RATELIMIT_LOCKOUT_SECONDS": 30,          # doubled for every further failure
+    "RATELIMIT_LOCKOUT_MAX_SECONDS": 900,
+    "RATELIMIT_FAILURE_WINDOW": 900,          # failures are forgotten after this long without another
+    "RATELIMIT_TRUSTED_PROXIES": 0,           # reverse proxies in front that append to X-Forwarded-For
+}
+
+
+def client_address(trusted_proxies):
+    """The client's address, as seen by the outermost of `trusted_proxies` reverse proxies.
+
+    Each proxy appends the address it received the request from to
+    X-Forwarded-For, so the entry `trusted_proxies` from the right is the one
+    the first trusted proxy saw; anything left of it is client-supplied and
+    could be forged. Like ProxyFix(x_for=n), but also applied on the ASGI
+    path, which does not go through app.wsgi_app.
+    """
+    if trusted_proxies > 0:
+        forwarded = [addr.strip() for header in request.headers.getlist("X-Forwarded-For")
+                     for addr in header.split(",") if addr.strip()]
+        if len(forwarded) >= trusted_proxies:
+            return forwarded[-trusted_proxies]
+    return request.remote_addr or "unknown"
+
+
+class RateLimited(APIException):
+    status_code = 429
+
+    def __init__(self, retry_after, message="Too many requests, please retry later"):
+        super().__init__(message, payload={"retry_after": retry_after})
+        self.retry_after = retry_after
+
+
+class MemoryStore:
+    """Limiter state for a single process.
+
+    Every entry is (value, stamp, expires_at); an entry past expires_at reads
+    as absent, which for a bucket means "full" and for a lockout "clean".
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, now):
+        entry = self._entries.get(key)
+        return entry if entry is not None and entry[2] > now else None
+
+    def update(self, key, fn, now):
+        """Atomically replace the entry with fn(entry)[0] and return fn(entry)[1]."""
+        with self._lock:
+            entry, result = fn(self.get(key, now))
+            if entry is None:
+                self._entries.pop(key, None)
+            else:
+                self._entries[key] = entry
+            if len(self._entries) % 1000 == 0:
+                self._purge(now)
+            return result
+
+    def _purge(self, now):
+        for key in [key for key, entry in self._entries.items() if entry[2] <= now]:
+            del self._entries[key]
+
+
+class SqliteStore:
+    """Limiter state shared by every worker through a small SQLite file.
+
+    Each update is a BEGIN IMMEDIATE read-modify-write, so concurrent workers
+    cannot both spend the last token in a bucket.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._updates = 0
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_limit (key TEXT PRIMARY KEY, "
+                         "value REAL NOT NULL, stamp REAL NOT NULL, expires_at REAL NOT NULL)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key, now):
+        return self._connect().execute(
+            "SELECT value, stamp, expires_at FROM rate_limit WHERE key = ? AND expires_at > ?",
+            (key, now)).fetchone()
+
+    def update(self, key, fn, now):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            entry, result = fn(self.get(key, now))
+            if entry is None:
+                conn.execute("DELETE FROM rate_limit WHERE key = ?", (key,))
+            else:
+                conn.execute("INSERT OR REPLACE INTO rate_limit (key, value, stamp, expires_at) "
+                             "VALUES (?, ?, ?, ?)", (key,) + tuple(entry))
+            self._updates += 1
+            if self._updates % 1000 == 0:
+                conn.execute("DELETE FROM rate_limit WHERE expires_at <= ?", (now,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+
+def make_store(store):
+    if store == "memory":
+        return MemoryStore()
+    if store.startswith("sqlite:///"):
+        return SqliteStore(store[len("sqlite:///"):])
+    raise ValueError(f"Unsupported RATELIMIT_STORE: {store}")
+
+
+def account_key(email):
+    # Addresses are case-insensitive in practice; hash them so the shared store holds no emails
+    return hashlib.blake2b(email.strip().lower().encode(), digest_size=16).hexdigest()
+
+
+class RateLimiter:
+    """Per-address and per-account limits checked before any password hashing.
+
+    Buckets are per scope ("login", "register"), so signing up does not eat
+    into the login allowance. Lockouts apply to logins only: after
+    RATELIMIT_LOCKOUT_AFTER failures the account is locked for
+    RATELIMIT_LOCKOUT_SECONDS, doubling with each further failure.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, value in DEFAULTS.items():
+            app.config.setdefault(key, type(value)(os.getenv(key, value)))
+        config = app.config
+        self.enabled = bool(config["RATELIMIT_ENABLED"])
+        self.store = make_store(config["RATELIMIT_STORE"])
+        self.limits = {
+            "ip": (config["RATELIMIT_IP_BURST"], config["RATELIMIT_IP_PER_MINUTE"] / 60),
+            "acct": (config["RATELIMIT_ACCOUNT_BURST"], config["RATELIMIT_ACCOUNT_PER_MINUTE"] / 60),
+        }
+        self.lockout_after = {"ip": config["RATELIMIT_IP_LOCKOUT_AFTER"], "acct": config["RATELIMIT_LOCKOUT_AFTER"]}
+        self.lockout_seconds = config["RATELIMIT_LOCKOUT_SECONDS"]
+        self.lockout_max = config["RATELIMIT_LOCKOUT_MAX_SECONDS"]
+        self.failure_window = config["RATELIMIT_FAILURE_WINDOW"]
+        self.trusted_proxies = config["RATELIMIT_TRUSTED_PROXIES"]
+        app.extensions["rate_limiter"] = self
+
+        @app.errorhandler(RateLimited)
+        def handle_rate_limited(error):
+            return jsonify(error.to_dict()), 429, {"Retry-After": str(error.retry_after)}
+
+    def _identities(self, email):
+        identities = [("ip", client_address(self.trusted_proxies))]
+        if email:
+            identities.append(("acct", account_key(email)))
+        return identities
+
+    def _take(self, key, capacity, rate, now):
+        def spend(entry):
+            tokens = capacity if entry is None else min(capacity, entry[0] + (now - entry[1]) * rate)
+            if tokens < 1:
+                return (tokens, now, now + (capacity - tokens) / rate), (1 - tokens) / rate
+            tokens -= 1
+            return (tokens, now, now + (capacity - tokens) / rate), 0
+        return self.store.update(key, spend, now)
+
+    def check(self, scope, email=None):
+        """Raise RateLimited if the caller is locked out or has used up a bucket; otherwise spend a token."""
+        if not self.enabled:
+            return
+        now = time.time()
+        identities = self._identities(email)
+        if scope == "login":
+            for kind, ident in identities:
+                entry = self.store.get(f"lock:{kind}:{ident}", now)
+                if entry is not None and entry[1] > now:
+                    RATE_LIMITED.inc(scope, "lockout")
+                    raise RateLimited(math.ceil(entry[1] - now))
+        for kind, ident in identities:
+            capacity, rate = self.limits[kind]
+            wait = self._take(f"{scope}:{kind}:{ident}", capacity, rate, now)
+            if wait:
+                RATE_LIMITED.inc(scope, kind)
+                raise RateLimited(math.ceil(wait))
+
+    def login_failed(self, email):
+        if not self.enabled:
+            return
+        now = time.time()
+        for kind, ident in self._identities(email):
+            threshold = self.lockout_after[kind]
+
+            def record(entry):
+                failures = 1 if entry is None else entry[0] + 1
+                locked_until = 0
+                if failures >= threshold:
+                    locked_until = now + min(self.lockout_max, self.lockout_seconds * 2 ** (failures - threshold))
+                return (failures, locked_until, max(locked_until, now + self.failure_window)), None
+
+            self.store.update(f"lock:{kind}:{ident}", record, now)
+
+    def login_succeeded(self, email):
+        if self.enabled:
+            self.store.update(f"lock:acct:{account_key(email)}", lambda entry: (None, None), time.time())
+
+
+def _limiter():
+    return current_app.extensions["rate_limiter"]
+
+
+def check_rate_limit(scope, email=None):
+    _limiter().check(scope, email)
+
+
+def login_failed(email):
+    _limiter().login_failed(email)
+
+
+def login_succeeded(email):
+    _limiter().login_succeeded(email)
@@ -1,45 +1,55 @@
-# src/api/routes.py - DEBUG VERSION with detailed logging
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token, decode_token
+# src/api/routes.py - API blueprint (logging goes through api.logging_config)
+from flask import Blueprint, Response, current_app, request, jsonify, send_file, stream_with_context, url_for
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt, decode_token
+from sqlalchemy.orm.exc import StaleDataError
 from datetime import datetime
-from werkzeug.security import check_password_hash, generate_password_hash
-from .models import db, Invoice, User
-import traceback
-import sys
+import logging
+import os
+from .models import db, ExportJob, Invoice, User
+from .utils import APIException
+from .passwords import hash_password, verify_password, needs_rehash, HashingBusy
+from .ratelimit import check_rate_limit, login_failed, login_succeeded
+from .idempotency import idempotent
+from .tokens import get_user_profile, revoke_token, revoke_family, issue_tokens, rotate_refresh_token
+from .invoice_query import user_invoices_query, parse_limit, fetch_page_json, iter_ndjson, page_json
+from .search import parse_query, search_page
+from .invoice_import import import_invoices, iter_rows, format_for, DEFAULT_CHUNK_SIZE
+from .invoice_batch import batch_scope, update_invoices, delete_invoices
+from .exports import FORMATS as EXPORT_FORMATS
+from .summaries import user_summary
+from .money import parse_currency, to_minor
+from .etags import make_etag, query_etag, not_modified, conditional, user_versions, invoice_version
 
 api = Blueprint('api', __name__)
+logger = logging.getLogger(__name__)
 
 # === USER REGISTRATION ===
 @api.route('/register', methods=['POST'])
+@idempotent(per_user=False)
 def register():
     try:
-        print("🔐 Registration attempt started")
         data = request.get_json()
-        print(f"📥 Registration data received: {data}")
-        
+
         if not data:
-            print("❌ No data provided in registration")
             return jsonify({"message": "No data provided"}), 400
             
         email = data.get('email')
         password = data.get('password')
         
-        print(f"📧 Email: {email}, Password length: {len(password) if password else 0}")
-        
         if not email or not password:
-            print("❌ Missing email or password")
             return jsonify({"message": "Email and password are required"}), 400
+
+        # Throttle before touching the database or the hashing pool
+        check_rate_limit("register")
         
         # Check if user already exists
         existing_user = User.query.filter_by(email=email).first()
         if existing_user:
-            print(f"❌ User already exists: {email}")
+            logger.debug("Registration rejected, email already registered")
             return jsonify({"message": "Email already registered"}), 409
         
         # Create new user
-        print(f"👤 Creating new user: {email}")
-        hashed_password = generate_password_hash(password)
-        print(f"🔐 Password hashed successfully")
+        hashed_password = hash_password(password)
         
         new_user = User(
             email=email, 
@@ -47,110 +57,127 @@ def register():
             is_active=True
         )
         
-        print("💾 Adding user to database...")
         db.session.add(new_user)
         db.session.commit()
         
-        print(f"✅ User created successfully: {email}")
+        logger.info("User registered: id=%s", new_user.id)
         return jsonify({"message": "User created successfully. Please log in."}), 201
-        
+
+    except APIException:
+        raise
+    except HashingBusy:
+        db.session.rollback()
+        return jsonify({"message": "Server busy, please retry"}), 503, {"Retry-After": "1"}
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Registration error: {str(e)}")
-        print(f"📍 Error type: {type(e).__name__}")
-        traceback.print_exc()
+        logger.exception("Registration failed")
         return jsonify({"message": f"Registration failed: {str(e)}"}), 500
 
 # === USER LOGIN ===
 @api.route('/login', methods=['POST'])
 def login():
     try:
-        print("🔐 Login attempt started")
-        print(f"📥 Request method: {request.method}")
-        print(f"📥 Request headers: {dict(request.headers)}")
-        
         data = request.get_json()
-        print(f"📥 Login data received: {data}")
         
         if not data:
-            print("❌ No JSON data provided in login")
             return jsonify({"message": "No data provided"}), 400
             
         email = data.get('email')
         password = data.get('password')
         
-        print(f"📧 Email: {email}")
-        print(f"🔐 Password provided: {bool(password)}")
-        
         if not email or not password:
-            print("❌ Missing email or password")
             return jsonify({"message": "Email and password are required"}), 400
+
+        # Locked-out or over-limit callers never reach the password check
+        check_rate_limit("login", email)
         
         # Find user
-        print(f"🔍 Looking for user: {email}")
         try:
             user = User.query.filter_by(email=email).first()
-            print(f"👤 User found: {bool(user)}")
-        except Exception as db_error:
-            print(f"❌ Database error finding user: {str(db_error)}")
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Database error looking up user for login")
             return jsonify({"message": "Database error"}), 500
         
-        if not user:
-            print(f"❌ User not found: {email}")
-            return jsonify({"message": "Invalid credentials"}), 401
-            
-        # Check password
-        print("🔐 Checking password...")
+        # Check password; unknown emails take an equal-cost dummy check so
+        # response time does not reveal which accounts exist
         try:
-            password_valid = check_password_hash(user.password, password)
-            print(f"🔐 Password valid: {password_valid}")
-        except Exception as pwd_error:
-            print(f"❌ Password check error: {str(pwd_error)}")
+            password_valid = verify_password(user.password if user else None, password)
+        except HashingBusy:
+            logger.warning("Password hashing pool saturated, rejecting login")
+            return jsonify({"message": "Server busy, please retry"}), 503, {"Retry-After": "1"}
+        except Exception:
+            logger.exception("Password verification error for user id=%s", user.id if user else None)
             return jsonify({"message": "Password verification failed"}), 500
-            
+
+        if not user:
+            logger.debug("Login failed: unknown email")
+            login_failed(email)
+            return jsonify({"message": "Invalid credentials"}), 401
+
         if not password_valid:
-            print(f"❌ Invalid password for: {email}")
+            logger.info("Login failed: bad password for user id=%s", user.id)
+            login_failed(email)
             return jsonify({"message": "Invalid credentials"}), 401
-        
-        print(f"✅ User authenticated: {email}")
+
+        login_succeeded(email)
+
+        # Upgrade hashes made with an older algorithm or cost while we have the password
+        if needs_rehash(user.password):
+            try:
+                user.password = hash_password(password)
+                db.session.commit()
+                logger.info("Password hash upgraded for user id=%s", user.id)
+            except Exception:
+                db.session.rollback()
+                logger.warning("Password rehash skipped for user id=%s", user.id, exc_info=True)
         
         # Create token
-        print("🔑 Creating JWT token...")
         try:
-            # Convert user.id to string for JWT compatibility
-            access_token = create_access_token(identity=str(user.id))
-            print(f"🔑 Token created successfully: {access_token[:30]}...")
+            # Short-lived access token plus a refresh token for /api/token/refresh
+            tokens = issue_tokens(user.id)
+            access_token = tokens["access_token"]
         except Exception as token_error:
-            print(f"❌ Token creation failed: {str(token_error)}")
-            print(f"📍 Token error type: {type(token_error).__name__}")
-            traceback.print_exc()
+            logger.exception("Token creation failed for user id=%s", user.id)
             return jsonify({"message": f"Token creation failed: {str(token_error)}"}), 500
         
         # Prepare response
         try:
             user_data = user.serialize()
-            print(f"👤 User data serialized: {user_data}")
-        except Exception as serialize_error:
-            print(f"❌ User serialization failed: {str(serialize_error)}")
+        except Exception:
+            logger.exception("User serialization failed for user id=%s", user.id)
             user_data = {"id": user.id, "email": user.email}
         
         response_data = {
             "token": access_token,
             "access_token": access_token,
+            "refresh_token": tokens["refresh_token"],
             "user": user_data
         }
         
-        print(f"✅ Login successful for: {email}")
+        logger.info("Login succeeded for user id=%s", user.id)
         return jsonify(response_data), 200
-        
+
+    except APIException:
+        raise
     except Exception as e:
-        print(f"❌ Unexpected login error: {str(e)}")
-        print(f"📍 Error type: {type(e).__name__}")
-        print(f"📍 Error args: {e.args}")
-        traceback.print_exc()
+        logger.exception("Unexpected login error")
         return jsonify({"message": f"Login failed: {str(e)}"}), 500
 
+# === TOKEN REFRESH ===
+@api.route('/token/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh_token():
+    try:
+        tokens = rotate_refresh_token(get_jwt())
+        return jsonify({
+            "token": tokens["access_token"],
+            "access_token": tokens["access_token"],
+            "refresh_token": tokens["refresh_token"]
+        }), 200
+    except Exception:
+        logger.exception("Token refresh failed")
+        return jsonify({"message": "Token refresh failed"}), 500
+
 # === GET CURRENT USER ===
 @api.route('/user', methods=['GET'])
 @jwt_required()
@@ -158,32 +185,68 @@ def get_current_user():
     try:
         current_user_id_str = get_jwt_identity()
         current_user_id = int(current_user_id_str)  # Convert back to int
-        print(f"🔍 Getting user info for ID: {current_user_id}")
-        
-        user = User.query.get(current_user_id)
-        
+        versions = user_versions(current_user_id)
+        if not versions:
+            return jsonify({"message": "User not found"}), 404
+        etag = make_etag("u", current_user_id, versions.version)
+        if not_modified(etag):
+            return conditional(Response(status=304), etag)
+
+        user = get_user_profile(current_user_id, versions.version)
         if not user:
             return jsonify({"message": "User not found"}), 404
-            
-        return jsonify({"user": user.serialize()}), 200
-        
-    except Exception as e:
-        print(f"❌ Get user error: {str(e)}")
+
+        return conditional((jsonify({"user": user}), 200), etag)
+
+    except Exception:
+        logger.exception("Get user failed")
         return jsonify({"message": "Failed to get user information"}), 500
 
+# === LOGOUT ===
+@api.route('/logout', methods=['POST'])
+@jwt_required()
+def logout():
+    try:
+        jwt_payload = get_jwt()
+        revoke_token(jwt_payload)
+        if jwt_payload.get("fam"):
+            revoke_family(jwt_payload["fam"])
+        return jsonify({"message": "Logged out"}), 200
+    except Exception:
+        logger.exception("Logout failed")
+        return jsonify({"message": "Logout failed"}), 500
+
 # === INVOICE COLLECTION ROUTE ===
 @api.route('/invoices', methods=['GET', 'POST'])
 @jwt_required()
+@idempotent()
 def handle_invoices():
     try:
         current_user_id_str = get_jwt_identity()
         current_user_id = int(current_user_id_str)  # Convert back to int
-        print(f"🔍 Processing invoices request for user ID: {current_user_id}")
+        logger.debug("Invoices %s for user id=%s", request.method, current_user_id)
 
         if request.method == 'GET':
-            invoices = Invoice.query.filter_by(user_id=current_user_id).all()
-            print(f"📋 Found {len(invoices)} invoices for user {current_user_id}")
-            return jsonify({"invoices": [invoice.serialize() for invoice in invoices]}), 200
+            # Any write to the user's invoices bumps invoices_version, so an
+            # unchanged version means an unchanged result for these arguments
+            versions = user_versions(current_user_id)
+            etag = query_etag("c", current_user_id, versions.invoices_version if versions else 0)
+            if not_modified(etag):
+                return conditional(Response(status=304), etag)
+
+            query = user_invoices_query(current_user_id, request.args)
+
+            # NDJSON export streams every matching row without building a list
+            wants_ndjson = (request.args.get('format') == 'ndjson' or
+                            request.accept_mimetypes.best == 'application/x-ndjson')
+            if wants_ndjson:
+                if 'limit' in request.args:
+                    query = query.limit(parse_limit(request.args['limit']))
+                return conditional(Response(stream_with_context(iter_ndjson(query)),
+                                            mimetype='application/x-ndjson'), etag)
+
+            body = fetch_page_json(query, parse_limit(request.args.get('limit')))
+            return conditional((Response(body, mimetype='application/json'), 200), etag)
 
         elif request.method == 'POST':
             data = request.get_json()
@@ -206,10 +269,17 @@ def handle_invoices():
                 parsed_date = datetime.strptime(invoice_date_str, '%Y-%m-%d').date() if invoice_date_str else datetime.now().date()
             except ValueError:
                 return jsonify({"message": "Invalid date format. Use YYYY-MM-DD"}), 400
+
+            try:
+                currency = parse_currency(data.get('currency'))
+                amount_minor = to_minor(invoice_amount, currency)
+            except ValueError as e:
+                return jsonify({"message": str(e)}), 400
             
             new_invoice = Invoice(
                 invoice_number=invoice_number,
-                invoice_amount=float(invoice_amount),
+                amount_minor=amount_minor,
+                currency=currency,
                 invoice_date=parsed_date,
                 user_id=current_user_id  # Already converted to int
             )
@@ -217,15 +287,178 @@ def handle_invoices():
             db.session.add(new_invoice)
             db.session.commit()
             
-            print(f"✅ Invoice created successfully: {invoice_number}")
+            logger.info("Invoice created: id=%s user id=%s", new_invoice.id, current_user_id)
             return jsonify(new_invoice.serialize()), 201
-            
-    except Exception as e:
+
+    except APIException:
+        raise
+    except Exception:
         db.session.rollback()
-        print(f"❌ Invoice handling error: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Invoice handling failed")
         return jsonify({"message": "Failed to process invoice request"}), 500
 
+# === INVOICE SEARCH ===
+@api.route('/invoices/search', methods=['GET'])
+@jwt_required()
+def search_invoices():
+    try:
+        current_user_id = int(get_jwt_identity())
+        q = parse_query(request.args.get('q'))
+        versions = user_versions(current_user_id)
+        etag = query_etag("q", current_user_id, versions.invoices_version if versions else 0)
+        if not_modified(etag):
+            return conditional(Response(status=304), etag)
+
+        rows, next_cursor = search_page(current_user_id, q, parse_limit(request.args.get('limit')),
+                                        request.args.get('cursor'))
+        return conditional((Response(page_json(rows, next_cursor), mimetype='application/json'), 200), etag)
+
+    except APIException:
+        raise
+    except Exception:
+        logger.exception("Invoice search failed")
+        return jsonify({"message": "Failed to search invoices"}), 500
+
+# === BATCH INVOICE UPDATE / DELETE ===
+@api.route('/invoices', methods=['PATCH', 'DELETE'])
+@jwt_required()
+@idempotent()
+def batch_invoices():
+    try:
+        current_user_id = int(get_jwt_identity())
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"message": "No data provided"}), 400
+
+        dry_run = data.get('dry_run') is True
+        where = batch_scope(current_user_id, data)
+        if request.method == 'PATCH':
+            matched = update_invoices(current_user_id, where, data.get('set'), dry_run=dry_run)
+        else:
+            matched = delete_invoices(current_user_id, where, dry_run=dry_run)
+
+        if dry_run:
+            db.session.rollback()
+        else:
+            logger.info("Batch %s for user id=%s: %d invoices", request.method, current_user_id, matched)
+        action = "updated" if request.method == 'PATCH' else "deleted"
+        return jsonify({"matched": matched, action: 0 if dry_run else matched, "dry_run": dry_run}), 200
+
+    except APIException:
+        db.session.rollback()
+        raise
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({"message": "Invoices were modified by another request, please retry"}), 409
+    except Exception:
+        db.session.rollback()
+        logger.exception("Batch invoice request failed")
+        return jsonify({"message": "Failed to process invoice request"}), 500
+
+# === BULK INVOICE IMPORT ===
+@api.route('/invoices/bulk', methods=['POST'])
+@jwt_required()
+@idempotent()
+def bulk_import_invoices():
+    try:
+        current_user_id = int(get_jwt_identity())
+        fmt = format_for(request.mimetype)
+        chunk_size = min(int(request.args.get('chunk_size', DEFAULT_CHUNK_SIZE)), 10000)
+        if chunk_size < 1:
+            return jsonify({"message": "Invalid chunk_size"}), 400
+
+        report = import_invoices(iter_rows(request.stream, fmt), current_user_id, chunk_size=chunk_size)
+        logger.info("Bulk import for user id=%s: %d inserted, %d failed",
+                    current_user_id, report.inserted, report.failed)
+        return jsonify(report.to_dict()), 201 if report.inserted else 200
+
+    except APIException:
+        db.session.rollback()
+        raise
+    except ValueError:
+        return jsonify({"message": "Invalid chunk_size"}), 400
+    except Exception:
+        db.session.rollback()
+        logger.exception("Bulk import failed")
+        return jsonify({"message": "Failed to import invoices"}), 500
+
+# === INVOICE EXPORT ===
+def export_status(job):
+    status = job.serialize()
+    if job.status == "done":
+        status["download_url"] = url_for('api.download_invoice_export', job_id=job.id)
+    return status
+
+@api.route('/invoices/export', methods=['POST'])
+@jwt_required()
+def start_invoice_export():
+    try:
+        current_user_id = int(get_jwt_identity())
+        data = request.get_json(silent=True) or {}
+        job = current_app.extensions["exports"].submit(
+            current_user_id, data.get('format', 'csv'), data.get('filter') or {})
+        location = url_for('api.invoice_export_status', job_id=job.id)
+        return jsonify(export_status(job)), 202, {"Location": location}
+
+    except APIException:
+        db.session.rollback()
+        raise
+    except Exception:
+        db.session.rollback()
+        logger.exception("Starting invoice export failed")
+        return jsonify({"message": "Failed to start invoice export"}), 500
+
+@api.route('/invoices/export/<int:job_id>', methods=['GET'])
+@jwt_required()
+def invoice_export_status(job_id):
+    job = ExportJob.query.filter_by(id=job_id, user_id=int(get_jwt_identity())).first()
+    if not job:
+        return jsonify({"message": "Export not found"}), 404
+    return jsonify(export_status(job)), 200
+
+@api.route('/invoices/export/<int:job_id>/download', methods=['GET'])
+@jwt_required()
+def download_invoice_export(job_id):
+    job = ExportJob.query.filter_by(id=job_id, user_id=int(get_jwt_identity())).first()
+    if not job:
+        return jsonify({"message": "Export not found"}), 404
+    if job.status != "done":
+        return jsonify({"message": f"Export is {job.status}", "status": job.status}), 409
+    extension, mimetype = EXPORT_FORMATS[job.format]
+    path = current_app.extensions["exports"].path(job)
+    if not os.path.exists(path):
+        # Written by a worker whose EXPORT_DIR is not shared with this one, or cleaned up since
+        logger.warning("Export %s is done but its file is missing: %s", job.id, path)
+        job.status = "failed"
+        job.error = "Export file is no longer available"
+        db.session.commit()
+        return jsonify({"message": "Export file is no longer available, start a new export", "status": job.status}), 410
+    # conditional=True answers Range and If-None-Match/If-Range from the file itself,
+    # so interrupted downloads of large exports can resume
+    response = send_file(path, mimetype=mimetype, as_attachment=True,
+                         download_name=f"invoices-{job.id}.{extension}", conditional=True, max_age=0)
+    response.headers.setdefault("Accept-Ranges", "bytes")
+    return response
+
+# === INVOICE SUMMARY ===
+@api.route('/invoices/summary', methods=['GET'])
+@jwt_required()
+def invoice_summary():
+    try:
+        current_user_id = int(get_jwt_identity())
+        try:
+            currency = parse_currency(request.args.get('currency'))
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 400
+        versions = user_versions(current_user_id)
+        etag = query_etag("s", current_user_id, versions.invoices_version if versions else 0)
+        if not_modified(etag):
+            return conditional(Response(status=304), etag)
+        return conditional((jsonify(user_summary(current_user_id, currency)), 200), etag)
+    except Exception:
+        logger.exception("Invoice summary failed")
+        return jsonify({"message": "Failed to load invoice summary"}), 500
+
 # === SINGLE INVOICE ROUTE ===
 @api.route('/invoices/<int:invoice_id>', methods=['GET', 'PUT', 'DELETE'])
 @jwt_required()
@@ -233,13 +466,22 @@ def handle_single_invoice(invoice_id):
     try:
         current_user_id_str = get_jwt_identity()
         current_user_id = int(current_user_id_str)  # Convert back to int
+
+        if request.method == 'GET':
+            version = invoice_version(invoice_id, current_user_id)
+            if version is not None:
+                etag = make_etag("i", invoice_id, version)
+                if not_modified(etag):
+                    return conditional(Response(status=304), etag)
+
         invoice = Invoice.query.filter_by(id=invoice_id, user_id=current_user_id).first()
 
         if not invoice:
             return jsonify({"message": "Invoice not found or permission denied"}), 404
 
         if request.method == 'GET':
-            return jsonify(invoice.serialize()), 200
+            return conditional((jsonify(invoice.serialize()), 200),
+                               make_etag("i", invoice.id, invoice.version))
             
         elif request.method == 'PUT':
             data = request.get_json()
@@ -247,7 +489,10 @@ def handle_single_invoice(invoice_id):
                 return jsonify({"message": "No data provided"}), 400
                 
             if 'invoice_amount' in data:
-                invoice.invoice_amount = float(data['invoice_amount'])
+                try:
+                    invoice.amount_minor = to_minor(data['invoice_amount'], invoice.currency)
+                except ValueError as e:
+                    return jsonify({"message": str(e)}), 400
             if 'invoice_date' in data:
                 try:
                     invoice.invoice_date = datetime.strptime(data['invoice_date'], '%Y-%m-%d').date()
@@ -255,19 +500,23 @@ def handle_single_invoice(invoice_id):
                     return jsonify({"message": "Invalid date format. Use YYYY-MM-DD"}), 400
                     
             db.session.commit()
-            print(f"✅ Invoice updated successfully: {invoice.invoice_number}")
-            return jsonify(invoice.serialize()), 200
+            logger.info("Invoice updated: id=%s", invoice.id)
+            return conditional((jsonify(invoice.serialize()), 200),
+                               make_etag("i", invoice.id, invoice.version))
 
         elif request.method == 'DELETE':
             db.session.delete(invoice)
             db.session.commit()
-            print(f"✅ Invoice deleted successfully: {invoice.invoice_number}")
+            logger.info("Invoice deleted: id=%s", invoice_id)
             return "", 204
-            
-    except Exception as e:
+
+    except StaleDataError:
+        # version_id_col: another request changed or deleted the row since we loaded it
         db.session.rollback()
-        print(f"❌ Single invoice error: {str(e)}")
-        traceback.print_exc()
+        return jsonify({"message": "Invoice was modified by another request, please retry"}), 409
+    except Exception:
+        db.session.rollback()
+        logger.exception("Single invoice request failed")
         return jsonify({"message": "Failed to process invoice request"}), 500
 
 # === MANUAL TOKEN TEST ===
@@ -280,25 +529,22 @@ def debug_test_token():
         if not token:
             return jsonify({"error": "No token provided"}), 400
         
-        print(f"🔍 Testing token: {token[:30]}...")
-        
         # Try to decode the token manually
         try:
             decoded = decode_token(token)
-            print(f"✅ Token decoded successfully: {decoded}")
             return jsonify({
                 "status": "valid",
                 "decoded": decoded
             }), 200
         except Exception as decode_error:
-            print(f"❌ Token decode failed: {str(decode_error)}")
+            logger.debug("Debug token decode failed: %s", decode_error)
             return jsonify({
                 "status": "invalid",
                 "error": str(decode_error)
             }), 422
             
     except Exception as e:
-        print(f"❌ Debug test token error: {str(e)}")
+        logger.exception("Debug test token failed")
         return jsonify({"error": str(e)}), 500
 
 # === TEST ROUTES ===
@@ -307,18 +553,16 @@ def debug_users():
     try:
         users = User.query.all()
         user_list = [{"id": u.id, "email": u.email, "is_active": u.is_active} for u in users]
-        print(f"📋 Found {len(users)} users in database")
         return jsonify({
             "total_users": len(users),
             "users": user_list
         }), 200
     except Exception as e:
-        print(f"❌ Error getting users: {str(e)}")
+        logger.exception("Debug users failed")
         return jsonify({"error": str(e)}), 500
 
 @api.route('/test', methods=['GET'])
 def test_route():
-    print("🧪 Test route accessed")
     return jsonify({
         "message": "API is working!",
         "timestamp": datetime.now().isoformat()
@@ -328,11 +572,7 @@ def test_route():
 @jwt_required()
 def test_auth():
     try:
-        print("🧪 Auth test route accessed")
-        print(f"📥 Request headers: {dict(request.headers)}")
-        
         current_user_id = get_jwt_identity()
-        print(f"🧪 Auth test for user: {current_user_id} (type: {type(current_user_id)})")
         
         # Convert back to int for database operations
         user_id_int = int(current_user_id)
@@ -344,7 +584,5 @@ def test_auth():
             "timestamp": datetime.now().isoformat()
         }), 200
     except Exception as e:
-        print(f"❌ Auth test error: {str(e)}")
-        print(f"📍 Error type: {type(e).__name__}")
-        traceback.print_exc()
+        logger.exception("Auth test failed")
         return jsonify({"message": f"Authentication test failed: {str(e)}"}), 500
\ No newline at end of file
@@ -0,0 +1,163 @@
+# src/api/search.py - Indexed substring search over invoice numbers (SQLite FTS5 trigram / PostgreSQL pg_trgm)
+import base64
+from sqlalchemy import column, event, func, literal_column, table, text
+from .models import db, Invoice
+from .utils import APIException
+from .invoice_query import INVOICE_COLUMNS
+
+# Trigram indexes cannot answer anything shorter; those queries become a prefix match
+MIN_SUBSTRING_LENGTH = 3
+MAX_QUERY_LENGTH = 100
+MAX_OFFSET = 1000
+
+# External-content FTS5 table: it stores only the trigram index and reads the
+# text from invoice, so the triggers below are all that keeps it current (they
+# also see Core inserts from the bulk import and raw SQL). A memo field would
+# be one more column here, in the triggers and in a migration. Note that
+# SQLite batch migrations recreate the invoice table and drop these triggers.
+SQLITE_INSERT_TRIGGER = (
+    "CREATE TRIGGER invoice_search_ai AFTER INSERT ON invoice BEGIN "
+    "INSERT INTO invoice_search(rowid, invoice_number) VALUES (new.id, new.invoice_number); END"
+)
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE invoice_search USING fts5("
+    "invoice_number, content='invoice', content_rowid='id', tokenize='trigram')",
+    SQLITE_INSERT_TRIGGER,
+    "CREATE TRIGGER invoice_search_ad AFTER DELETE ON invoice BEGIN "
+    "INSERT INTO invoice_search(invoice_search, rowid, invoice_number) "
+    "VALUES ('delete', old.id, old.invoice_number); END",
+    "CREATE TRIGGER invoice_search_au AFTER UPDATE OF invoice_number ON invoice BEGIN "
+    "INSERT INTO invoice_search(invoice_search, rowid, invoice_number) "
+    "VALUES ('delete', old.id, old.invoice_number); "
+    "INSERT INTO invoice_search(rowid, invoice_number) VALUES (new.id, new.invoice_number); END",
+    "INSERT INTO invoice_search(invoice_search) VALUES ('rebuild')",
+)
+
+POSTGRESQL_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_invoice_number_trgm ON invoice USING gin (invoice_number gin_trgm_ops)",
+)
+
+search_table = table("invoice_search", column("rowid"))
+search_ref = literal_column("invoice_search")
+
+
+@event.listens_for(db.Model.metadata, "after_create")
+def create_search_index(target, connection, **kw):
+    """Build the search index when create_all() sets up a database (migrations do it otherwise)."""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        exists = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'invoice_search'")).first()
+        if not exists:
+            for statement in SQLITE_DDL:
+                connection.execute(text(statement))
+    elif dialect == "postgresql":
+        for statement in POSTGRESQL_DDL:
+            connection.execute(text(statement))
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """Alembic autogenerate filter: the index objects above are not in the models, keep them."""
+    if type_ == "table" and name.startswith("invoice_search"):
+        return False
+    return not (type_ == "index" and name == "ix_invoice_number_trgm")
+
+
+def bulk_insert_invoices(conn, rows):
+    """Insert invoice rows with one executemany, indexing them for search in one statement.
+
+    On SQLite the per-row insert trigger costs most of a bulk insert, so it is
+    dropped, the new rows (all above the previous max id) are added to the
+    index with one INSERT ... SELECT, and the trigger is recreated. The write
+    lock is taken first (BEGIN IMMEDIATE, since pysqlite would only begin at
+    the INSERT), so no other connection can insert between reading max(id)
+    and the INSERT, or see the trigger missing; the caller commits.
+    """
+    if conn.dialect.name != "sqlite":
+        conn.execute(Invoice.__table__.insert(), rows)
+        return
+    if not conn.connection.dbapi_connection.in_transaction:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+    indexed = conn.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'invoice_search_ai'")).first()
+    if not indexed:
+        conn.execute(Invoice.__table__.insert(), rows)
+        return
+    conn.execute(text("DROP TRIGGER invoice_search_ai"))
+    last_id = conn.execute(text("SELECT coalesce(max(id), 0) FROM invoice")).scalar()
+    conn.execute(Invoice.__table__.insert(), rows)
+    conn.execute(text("INSERT INTO invoice_search(rowid, invoice_number) "
+                      "SELECT id, invoice_number FROM invoice WHERE id > :last_id"), {"last_id": last_id})
+    conn.execute(text(SQLITE_INSERT_TRIGGER))
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_query(user_id, q):
+    """The user's invoices whose number contains `q`, best match first.
+
+    Exact and prefix matches come before other substring hits; within those,
+    SQLite orders by FTS5's bm25 and PostgreSQL by trigram similarity.
+    """
+    query = db.session.query(*INVOICE_COLUMNS).filter(Invoice.user_id == user_id)
+    if len(q) < MIN_SUBSTRING_LENGTH:
+        # Served by ix_invoice_user_id_invoice_number, like number_prefix on the list endpoint
+        return (query.filter(Invoice.invoice_number >= q, Invoice.invoice_number < q + '\uffff')
+                .order_by(Invoice.invoice_number, Invoice.id))
+
+    exact_first = (Invoice.invoice_number == q).desc()
+    prefix_first = (func.substr(Invoice.invoice_number, 1, len(q)) == q).desc()
+    dialect = db.engine.dialect.name
+    if dialect == "sqlite":
+        # A quoted FTS5 string is a phrase; with the trigram tokenizer that is a substring match
+        phrase = '"' + q.replace('"', '""') + '"'
+        return (query.join(search_table, search_table.c.rowid == Invoice.id)
+                .filter(search_ref.op("MATCH")(phrase))
+                .order_by(exact_first, prefix_first, func.bm25(search_ref), Invoice.id.desc()))
+    if dialect == "postgresql":
+        return (query.filter(Invoice.invoice_number.ilike(f"%{_escape_like(q)}%", escape="\\"))
+                .order_by(exact_first, prefix_first, func.similarity(Invoice.invoice_number, q).desc(),
+                          Invoice.id.desc()))
+    raise APIException(f"Invoice search is not supported on {dialect}", status_code=501)
+
+
+def parse_query(value):
+    q = (value or "").strip()
+    if not q:
+        raise APIException("Missing search query q")
+    if len(q) > MAX_QUERY_LENGTH:
+        raise APIException(f"Search query is limited to {MAX_QUERY_LENGTH} characters")
+    return q
+
+
+def encode_offset(offset):
+    return base64.urlsafe_b64encode(str(offset).encode()).decode().rstrip('=')
+
+
+def decode_offset(cursor):
+    if not cursor:
+        return 0
+    try:
+        offset = int(base64.urlsafe_b64decode((cursor + '=' * (-len(cursor) % 4)).encode()))
+    except ValueError:
+        raise APIException("Invalid cursor")
+    if not 0 <= offset <= MAX_OFFSET:
+        raise APIException("Invalid cursor")
+    return offset
+
+
+def search_page(user_id, q, limit, cursor):
+    """(rows, next_cursor) for one page of ranked results.
+
+    Ranked results cannot resume from a (date, id) key, so the cursor is an
+    offset; paging stops after MAX_OFFSET results, by which point the query
+    should be refined.
+    """
+    offset = decode_offset(cursor)
+    rows = search_query(user_id, q).offset(offset).limit(limit + 1).all()
+    if len(rows) > limit and offset + limit <= MAX_OFFSET:
+        return rows[:limit], encode_offset(offset + limit)
+    return rows[:limit], None
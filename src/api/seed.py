@@ -0,0 +1,142 @@
+# src/api/seed.py - Synthetic users and invoices for load testing, inserted in bulk
+import math
+import multiprocessing
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from .models import db, User, InvoiceSummary
+from .money import exponent
+from .summaries import summary_rows
+from .search import bulk_insert_invoices
+
+DEFAULT_BATCH_SIZE = 50000    # invoices per transaction
+USER_BATCH_SIZE = 5000
+
+# Most customers bill in one currency; KWD and JPY keep the 3- and 0-decimal paths exercised
+CURRENCY_WEIGHTS = {"USD": 60, "EUR": 20, "GBP": 10, "CAD": 5, "JPY": 3, "KWD": 2}
+OTHER_CURRENCY_SHARE = 0.05
+MEDIAN_AMOUNT = 250           # in major units, before the per-user scale
+AMOUNT_SIGMA = 1.0
+MAX_AMOUNT = 1000000
+
+user_table = User.__table__
+summary_table = InvoiceSummary.__table__
+
+
+# --- Executed inside the worker processes (must stay picklable) ---
+
+def _invoice_dates(rng, count, days, today):
+    """`count` dates in the last `days` days, busier towards today and on weekdays."""
+    dates = []
+    while len(dates) < count:
+        # sqrt skews towards 1, so volume grows linearly over the period, like a growing business
+        day = date.fromordinal(today - int(days * (1 - math.sqrt(rng.random()))))
+        if day.weekday() >= 5 and rng.random() < 0.7:
+            continue
+        dates.append(day)
+    dates.sort()
+    return dates
+
+
+def generate_invoices(user_ids, per_user, days, today, seed):
+    """(invoice insert dicts, summary insert dicts) for `per_user` invoices of each user.
+
+    Each user gets its own generator seeded from (seed, user_id), so a dataset
+    is reproducible whatever the number of workers or the chunking.
+    """
+    currencies, weights = list(CURRENCY_WEIGHTS), list(CURRENCY_WEIGHTS.values())
+    invoices = []
+    for user_id in user_ids:
+        rng = random.Random(f"{seed}:{user_id}")
+        home = rng.choices(currencies, weights)[0]
+        # Some customers are much bigger than others: a lognormal amount scale per user
+        scale = MEDIAN_AMOUNT * rng.lognormvariate(0, 0.75)
+        for n, invoice_date in enumerate(_invoice_dates(rng, per_user, days, today), start=1):
+            currency = rng.choice(currencies) if rng.random() < OTHER_CURRENCY_SHARE else home
+            amount = min(max(scale * rng.lognormvariate(0, AMOUNT_SIGMA), 1), MAX_AMOUNT)
+            invoices.append({
+                "invoice_number": f"SEED-{user_id}-{n:07d}",
+                "amount_minor": round(amount * 10 ** exponent(currency)),
+                "currency": currency,
+                "invoice_date": invoice_date,
+                "user_id": user_id,
+                "version": 1,
+            })
+    summaries = summary_rows((row["user_id"], row["currency"], row["invoice_date"], row["amount_minor"])
+                             for row in invoices)
+    return invoices, summaries
+
+
+# --- Executed in the CLI process ---
+
+def insert_users(emails, password_hash):
+    """Insert users in batches and return their ids in the order of `emails`."""
+    ids = []
+    for start in range(0, len(emails), USER_BATCH_SIZE):
+        batch = emails[start:start + USER_BATCH_SIZE]
+        if db.session.query(User.id).filter(User.email.in_(batch)).first():
+            db.session.rollback()
+            raise ValueError(f"Some of {batch[0]} .. {batch[-1]} already exist; pick another --start")
+        db.session.execute(user_table.insert(), [
+            {"email": email, "password": password_hash, "is_active": True, "version": 1, "invoices_version": 1}
+            for email in batch])
+        # SQLite cannot return ids from an executemany; read them back through the unique email index
+        by_email = dict(db.session.query(User.email, User.id).filter(User.email.in_(batch)))
+        ids.extend(by_email[email] for email in batch)
+        db.session.commit()
+    return ids
+
+
+def _chunks(user_ids, per_user, batch_size):
+    step = max(1, batch_size // max(per_user, 1))
+    for start in range(0, len(user_ids), step):
+        yield user_ids[start:start + step]
+
+
+def _generated(chunks, args, workers):
+    """Yield generate_invoices() results chunk by chunk, optionally from a process pool.
+
+    At most two chunks per worker are in flight, so generation running ahead
+    of the inserts does not pile up in memory.
+    """
+    if not workers:
+        for chunk in chunks:
+            yield generate_invoices(chunk, *args)
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(generate_invoices, chunk, *args))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def seed(users, per_user, password_hash, start=1, email_prefix="test_user", days=730,
+         workers=0, batch_size=DEFAULT_BATCH_SIZE, random_seed=0, progress=None):
+    """Create `users` users with `per_user` invoices each; returns (users, invoices) inserted.
+
+    Every user shares `password_hash`, computed once by the caller. Invoices go
+    in with executemany inserts of `batch_size` rows, one transaction each,
+    together with the complete summary rows of the users in that batch (the
+    users are new, so nothing needs merging).
+    """
+    emails = [f"{email_prefix}{n}@test.com" for n in range(start, start + users)]
+    user_ids = insert_users(emails, password_hash)
+    args = (per_user, days, date.today().toordinal(), random_seed)
+
+    inserted = 0
+    started = time.perf_counter()
+    if per_user > 0:
+        for invoices, summaries in _generated(_chunks(user_ids, per_user, batch_size), args, workers):
+            conn = db.session.connection()
+            bulk_insert_invoices(conn, invoices)
+            conn.execute(summary_table.insert(), summaries)
+            db.session.commit()
+            inserted += len(invoices)
+            if progress:
+                progress(inserted, users * per_user, time.perf_counter() - started)
+    return len(user_ids), inserted
@@ -0,0 +1,202 @@
+# src/api/summaries.py - Keeps InvoiceSummary in step with Invoice inside the writing transaction
+from datetime import date
+from sqlalchemy import and_, event, func, inspect, select
+from sqlalchemy.orm import Session
+from .models import db, Invoice, InvoiceSummary, User
+from .money import DEFAULT_CURRENCY
+
+summary_table = InvoiceSummary.__table__
+invoice_table = Invoice.__table__
+
+
+def buckets(invoice_date):
+    """The three summary rows an invoice dated `invoice_date` counts towards."""
+    return (
+        ("all", ""),
+        ("year", f"{invoice_date.year:04d}"),
+        ("month", f"{invoice_date.year:04d}-{invoice_date.month:02d}"),
+    )
+
+
+def bucket_range(period_type, period):
+    if period_type == "year":
+        year = int(period)
+        return date(year, 1, 1), date(year, 12, 31)
+    if period_type == "month":
+        year, month = map(int, period.split("-"))
+        end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+        return date(year, month, 1), date.fromordinal(end.toordinal() - 1)
+    return None
+
+
+def _accumulate(deltas, rows, sign):
+    for user_id, currency, invoice_date, amount in rows:
+        for period_type, period in buckets(invoice_date):
+            d = deltas.setdefault((user_id, currency, period_type, period), {
+                "count": 0, "total": 0, "add_min": None, "add_max": None, "rem_min": None, "rem_max": None})
+            d["count"] += sign
+            d["total"] += sign * amount
+            lo, hi = ("add_min", "add_max") if sign > 0 else ("rem_min", "rem_max")
+            d[lo] = amount if d[lo] is None else min(d[lo], amount)
+            d[hi] = amount if d[hi] is None else max(d[hi], amount)
+
+
+def _insert_for(conn):
+    # Imported per call so a SQLite deployment never loads the PostgreSQL dialect
+    # (and vice versa) at startup; after the first call this is a dict lookup
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(summary_table)
+
+
+def _least(conn, a, b):
+    return (func.least if conn.dialect.name == "postgresql" else func.min)(a, b)
+
+
+def _greatest(conn, a, b):
+    return (func.greatest if conn.dialect.name == "postgresql" else func.max)(a, b)
+
+
+def apply_changes(conn, added=(), removed=()):
+    """Fold invoice rows into the summary table.
+
+    `added` and `removed` are iterables of (user_id, currency, invoice_date, amount_minor).
+    Count and total are adjusted with one upsert per touched bucket; min and
+    max are recomputed from the bucket's invoices (an index range scan) only
+    when a removed amount was the current extreme.
+    """
+    deltas = {}
+    _accumulate(deltas, added, 1)
+    _accumulate(deltas, removed, -1)
+    if not deltas:
+        return
+
+    insert = _insert_for(conn)
+    excluded = insert.excluded
+    c = summary_table.c
+    for (user_id, currency, period_type, period), d in deltas.items():
+        stmt = insert.values(
+            user_id=user_id, currency=currency, period_type=period_type, period=period,
+            invoice_count=d["count"], total_minor=d["total"],
+            min_minor=d["add_min"], max_minor=d["add_max"],
+        ).on_conflict_do_update(
+            index_elements=[c.user_id, c.currency, c.period_type, c.period],
+            set_={
+                "invoice_count": c.invoice_count + excluded.invoice_count,
+                "total_minor": c.total_minor + excluded.total_minor,
+                "min_minor": _least(conn, func.coalesce(c.min_minor, excluded.min_minor),
+                                    func.coalesce(excluded.min_minor, c.min_minor)),
+                "max_minor": _greatest(conn, func.coalesce(c.max_minor, excluded.max_minor),
+                                       func.coalesce(excluded.max_minor, c.max_minor)),
+            },
+        )
+        conn.execute(stmt)
+
+        key = and_(c.user_id == user_id, c.currency == currency,
+                   c.period_type == period_type, c.period == period)
+        if d["rem_min"] is not None:
+            scope = [invoice_table.c.user_id == user_id, invoice_table.c.currency == currency]
+            date_range = bucket_range(period_type, period)
+            if date_range:
+                scope.append(invoice_table.c.invoice_date.between(*date_range))
+            amount = invoice_table.c.amount_minor
+            conn.execute(summary_table.update().where(
+                key, (c.min_minor >= d["rem_min"]) | (c.max_minor <= d["rem_max"])
+            ).values(
+                min_minor=select(func.min(amount)).where(*scope).scalar_subquery(),
+                max_minor=select(func.max(amount)).where(*scope).scalar_subquery(),
+            ))
+            conn.execute(summary_table.delete().where(key, c.invoice_count <= 0))
+
+
+def _values(obj, committed):
+    state = inspect(obj)
+    values = []
+    for name in ("user_id", "currency", "invoice_date", "amount_minor"):
+        history = state.attrs[name].history
+        if committed and history.deleted:
+            values.append(history.deleted[0])
+        else:
+            values.append(getattr(obj, name))
+    return tuple(values)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_invoice_changes(session, flush_context):
+    added, removed = [], []
+    # A deleted user's summary rows go with it (ON DELETE CASCADE); upserting
+    # deltas for its invoices would insert rows for a user that is gone
+    deleted_users = {obj.id for obj in session.deleted if isinstance(obj, User)}
+    for obj in session.new:
+        if isinstance(obj, Invoice):
+            added.append(_values(obj, committed=False))
+    for obj in session.deleted:
+        if isinstance(obj, Invoice):
+            values = _values(obj, committed=True)
+            if values[0] not in deleted_users:
+                removed.append(values)
+    for obj in session.dirty:
+        if isinstance(obj, Invoice) and session.is_modified(obj, include_collections=False):
+            old, new = _values(obj, committed=True), _values(obj, committed=False)
+            if old != new:
+                removed.append(old)
+                added.append(new)
+    if added or removed:
+        apply_changes(session.connection(), added, removed)
+
+
+def user_summary(user_id, currency=DEFAULT_CURRENCY):
+    """Totals plus per-year and per-month buckets, read straight from the summary rows."""
+    rows = (InvoiceSummary.query.filter_by(user_id=user_id, currency=currency)
+            .order_by(InvoiceSummary.period).all())
+    return summary_from_rows(rows, currency)
+
+
+def summary_from_rows(rows, currency):
+    """Shape a user's InvoiceSummary rows (ordered by period) into the API response."""
+    overall = next((row for row in rows if row.period_type == "all"), None)
+    if overall is None:
+        overall = InvoiceSummary(currency=currency, period="", invoice_count=0, total_minor=0)
+    totals = overall.serialize()
+    totals.pop("period")
+    totals["currency"] = currency
+    totals["by_year"] = [row.serialize() for row in rows if row.period_type == "year"]
+    totals["by_month"] = [row.serialize() for row in rows if row.period_type == "month"]
+    return totals
+
+
+def summary_rows(invoices):
+    """Summary rows (insert dicts) computed from scratch for (user_id, currency, invoice_date, amount_minor) tuples."""
+    totals = {}
+    for user_id, currency, invoice_date, amount in invoices:
+        for period_type, period in buckets(invoice_date):
+            key = (user_id, currency, period_type, period)
+            t = totals.get(key)
+            if t is None:
+                totals[key] = [1, amount, amount, amount]
+            else:
+                t[0] += 1
+                t[1] += amount
+                t[2] = min(t[2], amount)
+                t[3] = max(t[3], amount)
+    return [{"user_id": user_id, "currency": currency, "period_type": period_type, "period": period,
+             "invoice_count": t[0], "total_minor": t[1], "min_minor": t[2], "max_minor": t[3]}
+            for (user_id, currency, period_type, period), t in totals.items()]
+
+
+def rebuild_summaries(user_ids=None, batch_size=10000):
+    """Recompute summaries from the invoice table (after raw SQL loads or to repair drift)."""
+    delete = summary_table.delete()
+    query = db.session.query(Invoice.user_id, Invoice.currency, Invoice.invoice_date, Invoice.amount_minor)
+    if user_ids is not None:
+        delete = delete.where(summary_table.c.user_id.in_(user_ids))
+        query = query.filter(Invoice.user_id.in_(user_ids))
+
+    rows = summary_rows(query.yield_per(batch_size))
+    db.session.execute(delete)
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(summary_table.insert(), rows[start:start + batch_size])
+    db.session.commit()
+    return len(rows)
@@ -0,0 +1,195 @@
+# src/api/tokens.py - JWT verification cache, token blocklist and cached user profiles
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from flask import current_app
+from flask_jwt_extended import JWTManager, create_access_token, create_refresh_token
+from .cache import TTLCache
+from .models import db, User
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "JWT_CLAIMS_CACHE_SIZE": 10000,
+    "JWT_CLAIMS_CACHE_TTL": 300,
+    "USER_PROFILE_CACHE_SIZE": 10000,
+    "USER_PROFILE_CACHE_TTL": 60,
+    "JWT_BLOCKLIST_STORE": "memory",           # memory | sqlite:///path/to/blocklist.db
+    "JWT_BLOCKLIST_REFRESH_SECONDS": 2,
+}
+
+
+class MemoryBlocklist:
+    """Revoked token ids, kept only until the token would have expired anyway."""
+
+    def __init__(self):
+        self._revoked = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, jti, expires_at):
+        with self._lock:
+            self._revoked[jti] = expires_at
+            if len(self._revoked) % 1000 == 0:
+                self._purge()
+
+    def _purge(self):
+        now = time.time()
+        for jti in [jti for jti, exp in self._revoked.items() if exp <= now]:
+            del self._revoked[jti]
+
+    def is_revoked(self, jti):
+        return jti in self._revoked
+
+
+class SqliteBlocklist(MemoryBlocklist):
+    """Blocklist shared between processes through a small SQLite file.
+
+    Lookups are answered from memory; new revocations written by other workers
+    are pulled in at most every `refresh_seconds`, so no request waits on a
+    per-token database query.
+    """
+
+    def __init__(self, path, refresh_seconds=2):
+        super().__init__()
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self._last_rowid = 0
+        self._next_refresh = 0
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS revoked_token "
+                         "(jti TEXT PRIMARY KEY, expires_at INTEGER NOT NULL)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def revoke(self, jti, expires_at):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO revoked_token (jti, expires_at) VALUES (?, ?)",
+                         (jti, int(expires_at)))
+            conn.execute("DELETE FROM revoked_token WHERE expires_at <= ?", (int(time.time()),))
+        super().revoke(jti, expires_at)
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now < self._next_refresh:
+            return
+        with self._lock:
+            self._next_refresh = now + self.refresh_seconds
+            with self._connect() as conn:
+                rows = conn.execute("SELECT rowid, jti, expires_at FROM revoked_token WHERE rowid > ?",
+                                    (self._last_rowid,)).fetchall()
+            for rowid, jti, expires_at in rows:
+                self._revoked[jti] = expires_at
+                self._last_rowid = max(self._last_rowid, rowid)
+
+    def is_revoked(self, jti):
+        self._refresh()
+        return super().is_revoked(jti)
+
+
+def make_blocklist(store, refresh_seconds):
+    if store == "memory":
+        return MemoryBlocklist()
+    if store.startswith("sqlite:///"):
+        return SqliteBlocklist(store[len("sqlite:///"):], refresh_seconds)
+    raise ValueError(f"Unsupported JWT_BLOCKLIST_STORE: {store}")
+
+
+class CachingJWTManager(JWTManager):
+    """JWTManager that remembers the claims of tokens it has already verified.
+
+    Entries are keyed by a digest of the encoded token and never outlive the
+    token's own `exp`, so an expired token always goes through full
+    verification and gets the normal expiry error. Revocation is still checked
+    on every request through the blocklist loader.
+    """
+
+    def init_app(self, app, add_context_processor=False):
+        super().init_app(app, add_context_processor)
+        for key, value in DEFAULTS.items():
+            app.config.setdefault(key, type(value)(os.getenv(key, value)))
+        self.claims_cache = TTLCache(app.config["JWT_CLAIMS_CACHE_SIZE"], app.config["JWT_CLAIMS_CACHE_TTL"])
+        self.profile_cache = TTLCache(app.config["USER_PROFILE_CACHE_SIZE"], app.config["USER_PROFILE_CACHE_TTL"])
+        self.blocklist = make_blocklist(app.config["JWT_BLOCKLIST_STORE"], app.config["JWT_BLOCKLIST_REFRESH_SECONDS"])
+
+        @self.token_in_blocklist_loader
+        def check_if_token_revoked(jwt_header, jwt_payload):
+            family = jwt_payload.get("fam")
+            if self.blocklist.is_revoked(jwt_payload.get("jti")):
+                if jwt_payload.get("type") == "refresh" and family:
+                    # A rotated refresh token came back: assume it leaked and
+                    # cut off every token issued from the same login
+                    logger.warning("Refresh token reuse detected, revoking family %s", family)
+                    revoke_family(family)
+                return True
+            return bool(family) and self.blocklist.is_revoked("fam:" + family)
+
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        if csrf_value is not None or allow_expired:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+
+        key = hashlib.blake2b(encoded_token.encode(), digest_size=16).digest()
+        claims = self.claims_cache.get(key)
+        if claims is None:
+            claims = super()._decode_jwt_from_config(encoded_token)
+            ttl = claims["exp"] - time.time() if "exp" in claims else None
+            self.claims_cache.set(key, claims, ttl)
+        return claims
+
+
+def _manager():
+    return current_app.extensions["flask-jwt-extended"]
+
+
+def revoke_token(jwt_payload):
+    """Add the token's jti to the blocklist until the token expires."""
+    expires_at = jwt_payload.get("exp", time.time() + 365 * 24 * 3600)
+    _manager().blocklist.revoke(jwt_payload["jti"], expires_at)
+
+
+def revoke_family(family):
+    """Revoke every access and refresh token issued from one login."""
+    expires_in = current_app.config["JWT_REFRESH_TOKEN_EXPIRES"]
+    _manager().blocklist.revoke("fam:" + family, time.time() + expires_in.total_seconds())
+
+
+def issue_tokens(user_id, family=None):
+    """Create an access/refresh pair; tokens from one login share a family id."""
+    claims = {"fam": family or uuid.uuid4().hex}
+    identity = str(user_id)
+    return {
+        "access_token": create_access_token(identity=identity, additional_claims=claims),
+        "refresh_token": create_refresh_token(identity=identity, additional_claims=claims),
+    }
+
+
+def rotate_refresh_token(jwt_payload):
+    """Spend a refresh token and return a new pair in the same family."""
+    revoke_token(jwt_payload)
+    return issue_tokens(jwt_payload["sub"], family=jwt_payload.get("fam"))
+
+
+def profile_cache():
+    return _manager().profile_cache
+
+
+def get_user_profile(user_id, version):
+    """Serialized user for one row version (from user_versions()).
+
+    Keyed on (user_id, version): every ORM update bumps the version, so an
+    entry cached by any worker can only ever be served for the row it was
+    built from, and entries for old versions just age out.
+    """
+    cache = _manager().profile_cache
+    profile = cache.get((user_id, version))
+    if profile is None:
+        user = User.query.get(user_id)
+        if user is None:
+            return None
+        profile = user.serialize()
+        cache.set((user_id, user.version), profile)
+    return profile
@@ -1,95 +1,188 @@
-# src/app.py - 
+# src/app.py - Application factory and the module-level `app` used by wsgi.py, asgi.py and Vercel
 import os
-from flask import Flask, request, jsonify, send_from_directory
+import click
+from flask import Flask, request, jsonify, abort
+from flask.cli import ScriptInfo
 from flask_cors import CORS
 from api.models import db, User
 from api.routes import api
-from flask_jwt_extended import JWTManager
+from api.utils import APIException
+from api.passwords import PasswordHashing
+from api.json_provider import configure_json
+from api.compression import Compression
+from api.ratelimit import RateLimiter
+from api.exports import Exports
+from api.assets import Assets
+from api.idempotency import Idempotency
+from api.logging_config import configure_logging
+from api.metrics import init_metrics, JWT_FAILURES
+from api.database import configure_database, prepare_schema, pool_status
+from api.tokens import CachingJWTManager
 from datetime import timedelta
 
 # Determine environment
 ENV = os.getenv("FLASK_ENV", "production")
 static_file_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../dist/')
+migrations_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../migrations')
 
-app = Flask(__name__)
-app.url_map.strict_slashes = False
-
-# CORS Configuration for production
-CORS(app, resources={
-    r"/*": {
-        "origins": ["*"],  # In production, restrict this to your domain
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
-        "supports_credentials": True
-    }
-})
-
-# JWT Configuration
-jwt_secret = os.getenv('JWT_SECRET_KEY', 'c5d31c781e8778ce21fa90343624ab197005cf9ba09571a4b9ab14d1d2b9c924')
-flask_secret = os.getenv('SECRET_KEY', 'd1d0aabfc292f761c393f8a8a035b1621c23fc27b0d660a91aa3a6ee6726d0b5')
-
-app.config['SECRET_KEY'] = flask_secret
-app.config['JWT_SECRET_KEY'] = jwt_secret
-app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=24)
-
-# Initialize JWT
-jwt = JWTManager(app)
-
-# JWT Error Handlers
-@jwt.expired_token_loader
-def expired_token_callback(jwt_header, jwt_payload):
-    return jsonify({"message": "Token has expired"}), 401
-
-@jwt.invalid_token_loader
-def invalid_token_callback(error_string):
-    return jsonify({"message": "Invalid token"}), 422
-
-@jwt.unauthorized_loader
-def unauthorized_callback(error_string):
-    return jsonify({"message": "Authorization required"}), 401
-
-# Database configuration - Use SQLite for Vercel
-# In production, you'd want to use a proper database service
-app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:///invoice_app.db"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Initialize database
-db.init_app(app)
-
-# Create tables
-with app.app_context():
-    db.create_all()
-
-# Register blueprint
-app.register_blueprint(api, url_prefix='/api')
-
-# Error handlers
-@app.errorhandler(404)
-def not_found(error):
-    return jsonify({"message": "Endpoint not found"}), 404
-
-@app.errorhandler(500)
-def internal_error(error):
-    return jsonify({"message": "Internal server error"}), 500
-
-# Routes
-@app.route('/')
-def index():
-    return send_from_directory(static_file_dir, 'index.html')
-
-@app.route('/health')
-def health_check():
-    return jsonify({
-        "status": "healthy",
-        "environment": ENV,
-        "jwt_configured": bool(app.config.get('JWT_SECRET_KEY'))
+
+def loaded_by_flask_cli():
+    # The flask command imports the app inside a click context that carries its
+    # ScriptInfo; gunicorn, uvicorn and Vercel never do
+    ctx = click.get_current_context(silent=True)
+    return ctx is not None and ctx.find_object(ScriptInfo) is not None
+
+
+def create_app(cli=None):
+    """Build and configure the Flask app.
+
+    Serving processes only pay for what requests use: the CLI commands and
+    Flask-Migrate are registered when the app is loaded by the `flask`
+    command (or cli=True), Flask-Admin only with ADMIN_ENABLED=1, and tables
+    are created on the first request rather than at import (DB_CREATE_ALL).
+    """
+    if cli is None:
+        cli = loaded_by_flask_cli()
+
+    app = Flask(__name__)
+    app.url_map.strict_slashes = False
+
+    # Logging (LOG_LEVEL, LOG_LEVELS and LOG_FORMAT are read from the environment)
+    configure_logging(app)
+
+    # orjson when installed (JSON_ENCODER=stdlib forces the default encoder)
+    configure_json(app)
+
+    # CORS Configuration for production
+    CORS(app, resources={
+        r"/*": {
+            "origins": ["*"],  # In production, restrict this to your domain
+            "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+            "allow_headers": ["Content-Type", "Authorization", "Idempotency-Key"],
+            "supports_credentials": True
+        }
     })
 
-@app.route('/<path:path>')
-def serve_static(path):
-    if os.path.exists(os.path.join(static_file_dir, path)):
-        return send_from_directory(static_file_dir, path)
-    return send_from_directory(static_file_dir, 'index.html')
+    # JWT Configuration
+    jwt_secret = os.getenv('JWT_SECRET_KEY', 'c5d31c781e8778ce21fa90343624ab197005cf9ba09571a4b9ab14d1d2b9c924')
+    flask_secret = os.getenv('SECRET_KEY', 'd1d0aabfc292f761c393f8a8a035b1621c23fc27b0d660a91aa3a6ee6726d0b5')
+
+    app.config['SECRET_KEY'] = flask_secret
+    app.config['JWT_SECRET_KEY'] = jwt_secret
+    # Access tokens are short-lived; clients renew them through /api/token/refresh
+    app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(minutes=int(os.getenv('JWT_ACCESS_TOKEN_MINUTES', 15)))
+    app.config["JWT_REFRESH_TOKEN_EXPIRES"] = timedelta(days=int(os.getenv('JWT_REFRESH_TOKEN_DAYS', 30)))
+
+    # Initialize JWT (verified claims are cached; revoked tokens are checked on every request)
+    jwt = CachingJWTManager(app)
+
+    # JWT Error Handlers
+    @jwt.expired_token_loader
+    def expired_token_callback(jwt_header, jwt_payload):
+        JWT_FAILURES.inc("expired")
+        return jsonify({"message": "Token has expired"}), 401
+
+    @jwt.invalid_token_loader
+    def invalid_token_callback(error_string):
+        JWT_FAILURES.inc("invalid")
+        return jsonify({"message": "Invalid token"}), 422
+
+    @jwt.unauthorized_loader
+    def unauthorized_callback(error_string):
+        JWT_FAILURES.inc("missing")
+        return jsonify({"message": "Authorization required"}), 401
+
+    @jwt.revoked_token_loader
+    def revoked_token_callback(jwt_header, jwt_payload):
+        JWT_FAILURES.inc("revoked")
+        return jsonify({"message": "Token has been revoked"}), 401
+
+    # Database configuration - DATABASE_URL (SQLite by default, e.g. for Vercel) and
+    # pool/PRAGMA settings come from the environment, see api/database.py
+    configure_database(app)
+
+    # Initialize database
+    db.init_app(app)
+
+    # Password hashing (PASSWORD_HASH_* settings are read from the environment)
+    password_hashing = PasswordHashing(app)
+    rate_limiter = RateLimiter(app)
+    compression = Compression(app)
+    exports = Exports(app)
+    # Idempotency-Key on the mutating invoice and registration routes (IDEMPOTENCY_* settings)
+    idempotency = Idempotency(app)
+    # Front-end build in dist/, indexed once here (precompressed siblings from `flask compress-assets`)
+    assets = Assets(static_file_dir, app)
+
+    # Request, SQL and auth metrics on /metrics (set METRICS_DIR under multi-process gunicorn)
+    init_metrics(app, db)
+
+    # Missing tables are created before the first request by default (DB_CREATE_ALL=lazy);
+    # with DB_CREATE_ALL=off the schema comes only from `flask db upgrade`
+    prepare_schema(app, db)
+
+    # Register blueprint
+    app.register_blueprint(api, url_prefix='/api')
+
+    # CLI commands and migrations, only for the flask command (imports alembic)
+    if cli:
+        from flask_migrate import Migrate
+        from api.commands import setup_commands
+        from api.search import include_object
+        Migrate(app, db, directory=migrations_dir, include_object=include_object)
+        setup_commands(app)
+
+    # Flask-Admin on /admin, off unless ADMIN_ENABLED=1 (imports WTForms and the admin templates);
+    # its views require ADMIN_USERNAME / ADMIN_PASSWORD
+    if os.getenv('ADMIN_ENABLED', '0') == '1':
+        from api.admin import setup_admin
+        setup_admin(app)
+
+    # Error handlers
+    @app.errorhandler(APIException)
+    def handle_api_exception(error):
+        return jsonify(error.to_dict()), error.status_code
+
+    @app.errorhandler(404)
+    def not_found(error):
+        return jsonify({"message": "Endpoint not found"}), 404
+
+    @app.errorhandler(500)
+    def internal_error(error):
+        return jsonify({"message": "Internal server error"}), 500
+
+    # Routes
+    @app.route('/')
+    def index():
+        return assets.serve('index.html') or abort(404)
+
+    @app.route('/health')
+    def health_check():
+        database = pool_status(db)
+        if not database["reachable"]:
+            status, code = "unhealthy", 503
+        elif database.get("saturation", 0) >= 0.9:
+            status, code = "degraded", 200
+        else:
+            status, code = "healthy", 200
+        return jsonify({
+            "status": status,
+            "environment": ENV,
+            "jwt_configured": bool(app.config.get('JWT_SECRET_KEY')),
+            "database": database
+        }), code
+
+    @app.route('/<path:path>')
+    def serve_static(path):
+        # Unknown API paths are JSON 404s, not the SPA's index.html
+        if path.startswith('api/'):
+            abort(404)
+        return assets.serve(path) or abort(404)
+
+    return app
+
+
+app = create_app()
 
 # Vercel serverless function handler
 def handler(request):
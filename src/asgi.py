@@ -0,0 +1,52 @@
+# src/asgi.py - ASGI entry point: async versions of the hot /api routes, the Flask app for the rest
+#   $ uvicorn asgi:application --app-dir src --workers 4
+#   $ gunicorn asgi:application -k uvicorn.workers.UvicornWorker --chdir ./src/
+from contextlib import asynccontextmanager
+from a2wsgi import WSGIMiddleware
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.routing import Route, Router
+from app import app as flask_app
+from api.async_routes import AsyncAPI
+
+async_api = AsyncAPI(flask_app)
+wsgi_app = WSGIMiddleware(flask_app)
+
+
+class IdempotentRequestsToWSGI:
+    """Sends POSTs that carry an Idempotency-Key to the Flask app, which stores and replays
+    responses for them (api/idempotency.py); the async handlers have no key store."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] == "http" and scope["method"] == "POST"
+                and any(name == b"idempotency-key" for name, _ in scope["headers"])):
+            await wsgi_app(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await async_api.close()
+
+
+# Anything without an async version (admin, metrics, refresh, bulk import, static files)
+# is served by the WSGI app on a thread pool
+application = Router(
+    routes=async_api.routes() + [
+        # Batch PATCH/DELETE share the collection path with the async GET/POST
+        Route("/api/invoices", wsgi_app, methods=["PATCH", "DELETE"]),
+    ],
+    default=wsgi_app,
+    lifespan=lifespan,
+    middleware=[Middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+        allow_headers=["Content-Type", "Authorization", "Idempotency-Key"],
+    ), Middleware(IdempotentRequestsToWSGI)],
+)
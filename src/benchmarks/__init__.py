@@ -0,0 +1,2 @@
+# src/benchmarks - Performance harnesses for the API. Run them from ./src, e.g.
+#   $ python -m benchmarks.api_bench --users 50 --invoices 200 --concurrency 8
@@ -0,0 +1,383 @@
+# src/benchmarks/api_bench.py - Seed a database, drive the API concurrently and compare to a baseline
+"""Load test for the invoice API.
+
+    $ cd src
+    $ python -m benchmarks.api_bench --users 20 --invoices 500 --concurrency 8
+    $ python -m benchmarks.api_bench --driver wsgi --save-baseline
+    $ python -m benchmarks.api_bench --driver wsgi --compare     # exits 1 on regression
+    $ python -m benchmarks.api_bench --driver asgi --concurrency 64 --users 64
+
+The database is seeded directly (bulk inserts, one precomputed password hash)
+and then every scenario is driven through the Flask test client, a real
+threaded WSGI server over HTTP, or the ASGI entry point (src/asgi.py) under
+uvicorn. Use --url to target a server started separately (e.g. gunicorn) that
+points at the same --db.
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+BENCH_PASSWORD = "bench-password"
+SCENARIOS = ("register", "login", "create", "get", "update", "list", "list_ndjson", "summary", "bulk", "delete")
+
+
+# === DATABASE SEEDING ===
+def build_app(db_uri, verbose=False):
+    os.environ["DATABASE_URL"] = db_uri
+    # Every simulated client shares one address; the limiter would turn the run into 429s
+    os.environ.setdefault("RATELIMIT_ENABLED", "0")
+    from app import app
+    from api.models import db
+    if not verbose:
+        # Per-request INFO lines would dominate both the output and the timings
+        for name in ("api", "werkzeug"):
+            logging.getLogger(name).setLevel(logging.WARNING)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed(app, users, invoices_per_user, run_id):
+    """Insert users and invoices in large batches and return {user_id: [invoice ids]}."""
+    from api.models import db, User, Invoice
+    from api.passwords import hash_password
+    from api.summaries import rebuild_summaries
+
+    rng = random.Random(42)
+    today = date.today()
+    with app.app_context():
+        password = hash_password(BENCH_PASSWORD)
+        db.session.execute(User.__table__.insert(), [
+            {"email": f"bench-{run_id}-{i}@bench.local", "password": password, "is_active": True}
+            for i in range(users)
+        ])
+        user_ids = [uid for (uid,) in db.session.query(User.id)
+                    .filter(User.email.like(f"bench-{run_id}-%")).order_by(User.id)]
+
+        batch = []
+        for user_id in user_ids:
+            for n in range(invoices_per_user):
+                batch.append({
+                    "invoice_number": f"S-{run_id}-{user_id}-{n}",
+                    "amount_minor": int(rng.lognormvariate(5, 1.2) * 100),
+                    "currency": "USD",
+                    "invoice_date": today - timedelta(days=rng.randint(0, 3 * 365)),
+                    "user_id": user_id,
+                })
+                if len(batch) >= 10000:
+                    db.session.execute(Invoice.__table__.insert(), batch)
+                    batch = []
+        if batch:
+            db.session.execute(Invoice.__table__.insert(), batch)
+        db.session.commit()
+        rebuild_summaries(user_ids)
+
+        owned = {user_id: [] for user_id in user_ids}
+        for invoice_id, user_id in (db.session.query(Invoice.id, Invoice.user_id)
+                                    .filter(Invoice.user_id.in_(user_ids))):
+            owned[user_id].append(invoice_id)
+    return owned
+
+
+def make_tokens(app, user_ids):
+    from api.tokens import issue_tokens
+    with app.test_request_context():
+        return {user_id: issue_tokens(user_id)["access_token"] for user_id in user_ids}
+
+
+# === REQUEST DRIVERS ===
+class TestClientSession:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        response = self.client.open(path, method=method, data=body, headers=headers or {})
+        response.get_data()
+        return response.status_code
+
+
+class HTTPSession:
+    """One keep-alive connection per worker thread."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+
+    def request(self, method, path, body=None, headers=None):
+        try:
+            self.conn.request(method, path, body=body, headers=headers or {})
+            response = self.conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            # server closed the keep-alive connection; retry once on a new one
+            self.conn.close()
+            self.conn.request(method, path, body=body, headers=headers or {})
+            response = self.conn.getresponse()
+        response.read()
+        return response.status
+
+
+def start_wsgi_server(app):
+    from werkzeug.serving import make_server
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+class ASGIServer:
+    def __init__(self):
+        import uvicorn
+        from asgi import application
+        self.server = uvicorn.Server(uvicorn.Config(application, host="127.0.0.1", port=0,
+                                                    log_level="warning", backlog=4096))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    def shutdown(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def start_asgi_server():
+    server = ASGIServer()
+    return server, server.start()
+
+
+# === SCENARIOS ===
+def json_request(session, method, path, payload=None, token=None, content_type="application/json"):
+    headers = {"Content-Type": content_type}
+    if token:
+        headers["Authorization"] = "Bearer " + token
+    body = payload if isinstance(payload, (str, bytes)) or payload is None else json.dumps(payload)
+    return session.request(method, path, body, headers)
+
+
+class Worker:
+    """State for one concurrent client: its user, token and invoices."""
+
+    def __init__(self, index, run_id, user_id, token, invoice_ids, session):
+        self.index = index
+        self.run_id = run_id
+        self.user_id = user_id
+        self.token = token
+        self.invoice_ids = invoice_ids
+        self.session = session
+        self.counter = 0
+
+    def unique(self, prefix):
+        self.counter += 1
+        return f"{prefix}-{self.run_id}-{self.index}-{self.counter}"
+
+    def register(self):
+        return json_request(self.session, "POST", "/api/register",
+                            {"email": self.unique("reg") + "@bench.local", "password": BENCH_PASSWORD})
+
+    def login(self):
+        return json_request(self.session, "POST", "/api/login",
+                            {"email": f"bench-{self.run_id}-{self.index}@bench.local", "password": BENCH_PASSWORD})
+
+    def create(self):
+        return json_request(self.session, "POST", "/api/invoices",
+                            {"invoice_number": self.unique("C"), "invoice_amount": 125.5, "invoice_date": "2024-05-01"},
+                            self.token)
+
+    def get(self):
+        return json_request(self.session, "GET", f"/api/invoices/{random.choice(self.invoice_ids)}", token=self.token)
+
+    def update(self):
+        return json_request(self.session, "PUT", f"/api/invoices/{random.choice(self.invoice_ids)}",
+                            {"invoice_amount": round(random.uniform(1, 5000), 2)}, self.token)
+
+    def list(self):
+        return json_request(self.session, "GET", "/api/invoices?limit=100", token=self.token)
+
+    def list_ndjson(self):
+        return json_request(self.session, "GET", "/api/invoices?format=ndjson", token=self.token)
+
+    def summary(self):
+        return json_request(self.session, "GET", "/api/invoices/summary", token=self.token)
+
+    def bulk(self):
+        rows = [{"invoice_number": self.unique("B"), "invoice_amount": 10 + i, "invoice_date": "2024-06-01"}
+                for i in range(100)]
+        return json_request(self.session, "POST", "/api/invoices/bulk", rows, self.token)
+
+    def delete(self):
+        # Each seeded invoice can be deleted once; past that there is nothing to send
+        if not self.invoice_ids:
+            return None
+        return json_request(self.session, "DELETE", f"/api/invoices/{self.invoice_ids.pop()}", token=self.token)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def run_scenario(workers, name, requests_total):
+    per_worker = max(1, requests_total // len(workers))
+
+    def drive(worker):
+        latencies, errors = [], 0
+        action = getattr(worker, name)
+        for _ in range(per_worker):
+            start = time.perf_counter()
+            status = action()
+            if status is None:
+                break  # the worker ran out of seeded data; only requests actually sent count
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors += 1
+        return latencies, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(workers)) as pool:
+        results = list(pool.map(drive, workers))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(lat for lats, _ in results for lat in lats)
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors for _, errors in results),
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+# === REPORTING ===
+def print_report(results, title):
+    print(f"\n{title}")
+    print(f"{'scenario':<12} {'reqs':>6} {'errs':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, r in results.items():
+        print(f"{name:<12} {r['requests']:>6} {r['errors']:>5} {r['throughput']:>9.1f} "
+              f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f}")
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human readable regressions against the stored baseline."""
+    regressions = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if r["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {r['p95_ms']:.2f}ms vs baseline {base['p95_ms']:.2f}ms")
+        if r["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: {r['throughput']:.1f} req/s vs baseline {base['throughput']:.1f} req/s")
+        if r["errors"] > base.get("errors", 0):
+            regressions.append(f"{name}: {r['errors']} errors vs baseline {base.get('errors', 0)}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="SQLAlchemy URI to seed and benchmark (default: a temporary SQLite file)")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--invoices", type=int, default=200, help="invoices seeded per user")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--driver", choices=("client", "wsgi", "asgi"), default="client")
+    parser.add_argument("--url", help="benchmark an already running server instead of starting one")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="fail if results regress past --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's INFO request logs")
+    args = parser.parse_args(argv)
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    if args.concurrency > args.users:
+        parser.error("--concurrency cannot exceed --users (each client uses its own account)")
+
+    db_uri = args.db or "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="invoice-bench-"), "bench.db")
+    run_id = uuid.uuid4().hex[:8]
+    app = build_app(db_uri, args.verbose)
+
+    started = time.perf_counter()
+    owned = seed(app, args.users, args.invoices, run_id)
+    print(f"Seeded {args.users} users x {args.invoices} invoices into {db_uri} "
+          f"in {time.perf_counter() - started:.1f}s")
+    tokens = make_tokens(app, list(owned))
+
+    server = None
+    if args.url:
+        base_url = args.url
+    elif args.driver == "wsgi":
+        server, base_url = start_wsgi_server(app)
+    elif args.driver == "asgi":
+        server, base_url = start_asgi_server()
+
+    def new_session():
+        return HTTPSession(base_url) if (args.url or args.driver != "client") else TestClientSession(app)
+
+    user_ids = list(owned)[:args.concurrency]
+    workers = [Worker(i, run_id, user_id, tokens[user_id], owned[user_id], new_session())
+               for i, user_id in enumerate(user_ids)]
+
+    results = {}
+    try:
+        for name in scenarios:
+            results[name] = run_scenario(workers, name, args.requests)
+    finally:
+        if server is not None:
+            server.shutdown()
+        hashing = app.extensions.get("password_hashing")
+        if hashing is not None:
+            hashing.shutdown()
+
+    title = f"driver={'url' if args.url else args.driver} concurrency={args.concurrency} " \
+            f"users={args.users} invoices/user={args.invoices}"
+    print_report(results, title)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"\nNo baseline at {args.baseline}; run with --save-baseline first")
+            return 2
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\nPERFORMANCE REGRESSION (tolerance {args.tolerance:.0%}):")
+            for line in regressions:
+                print("  - " + line)
+            return 1
+        print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
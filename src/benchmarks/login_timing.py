@@ -0,0 +1,83 @@
+# src/benchmarks/login_timing.py - Compare failed-login latency for existing and unknown accounts
+"""Timing check for the login endpoint.
+
+    $ cd src
+    $ python -m benchmarks.login_timing --attempts 200
+    $ python -m benchmarks.login_timing --attempts 400 --dummy-rate 5   # exercise the over-budget path
+
+Wrong-password logins for seeded accounts and logins for emails that do not
+exist are interleaved so both see the same load. The report shows their
+latency percentiles, the largest gap between the two distributions
+(Kolmogorov-Smirnov statistic; near 0 means indistinguishable) and how many
+real KDF runs the unknown emails cost.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from .api_bench import BENCH_PASSWORD, build_app, percentile, seed
+
+
+def ks_statistic(a, b):
+    a, b = sorted(a), sorted(b)
+    i = j = 0
+    gap = 0.0
+    while i < len(a) and j < len(b):
+        if a[i] <= b[j]:
+            i += 1
+        else:
+            j += 1
+        gap = max(gap, abs(i / len(a) - j / len(b)))
+    return gap
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--db", help="SQLAlchemy URL (default: a temporary SQLite file)")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--attempts", type=int, default=200, help="attempts per account class")
+    parser.add_argument("--dummy-rate", type=float, help="override PASSWORD_DUMMY_VERIFY_PER_SECOND")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+    if args.dummy_rate is not None:
+        os.environ["PASSWORD_DUMMY_VERIFY_PER_SECOND"] = str(args.dummy_rate)
+    db_uri = args.db or "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="login-timing-"), "bench.db")
+    app = build_app(db_uri)
+    run_id = "%x" % int(time.time())
+    user_ids = seed(app, args.users, 0, run_id)
+    emails = [f"bench-{run_id}-{i}@bench.local" for i in range(len(user_ids))]
+
+    from api.metrics import PASSWORD_HASH_LATENCY
+    client = app.test_client()
+    # One correct login so the known-account path has a verify time to compare against
+    client.post("/api/login", json={"email": emails[0], "password": BENCH_PASSWORD})
+
+    timings = {"existing": [], "unknown": []}
+    plan = ["existing", "unknown"] * args.attempts
+    random.shuffle(plan)
+    for n, kind in enumerate(plan):
+        email = random.choice(emails) if kind == "existing" else f"nobody-{run_id}-{n}@example.com"
+        start = time.perf_counter()
+        response = client.post("/api/login", json={"email": email, "password": "wrong-password"})
+        timings[kind].append(time.perf_counter() - start)
+        if response.status_code != 401:
+            print(f"unexpected status {response.status_code} for {kind} account", file=sys.stderr)
+            return 1
+
+    print(f"{'class':<10} {'n':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for kind, values in timings.items():
+        values = sorted(values)
+        print(f"{kind:<10} {len(values):>5} " + " ".join(
+            f"{percentile(values, pct) * 1000:8.2f}" for pct in (50, 95, 99)))
+    dummy = PASSWORD_HASH_LATENCY.values.get(("dummy",))
+    dummy_runs = dummy[-1] if dummy else 0
+    print(f"KS statistic: {ks_statistic(timings['existing'], timings['unknown']):.3f}")
+    print(f"KDF runs for unknown emails: {dummy_runs} of {args.attempts}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+# src/benchmarks/serialization_bench.py - Encode time and payload size for large invoice lists
+"""JSON encoding and compression benchmark for invoice collections.
+
+    $ cd src
+    $ python -m benchmarks.serialization_bench --rows 10000
+
+Compares the old path (Invoice.serialize() dicts through the stdlib encoder),
+the same dicts through orjson, and the pre-rendered row template used by
+GET /api/invoices and the NDJSON export. Then reports the payload size and
+compression time for identity, gzip and (if installed) brotli.
+"""
+import argparse
+import gzip
+import random
+import sys
+import time
+from datetime import date, timedelta
+from flask import Flask
+
+
+def make_rows(count):
+    from api.money import DEFAULT_CURRENCY
+    rng = random.Random(7)
+    today = date.today()
+    return [(n + 1, f"INV-{n:08d}", int(rng.lognormvariate(5, 1.2) * 100), DEFAULT_CURRENCY,
+             today - timedelta(days=rng.randint(0, 1000)), 1 + n % 50) for n in range(count)]
+
+
+def best_of(repeat, fn):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5, help="best-of runs per measurement")
+    args = parser.parse_args(argv)
+
+    from api.models import Invoice
+    from api.invoice_query import render_row
+    from api.json_provider import configure_json, orjson
+    from api.compression import brotli, DEFAULTS as COMPRESS_DEFAULTS
+
+    rows = make_rows(args.rows)
+    invoices = [Invoice(id=r[0], invoice_number=r[1], amount_minor=r[2], currency=r[3],
+                        invoice_date=r[4], user_id=r[5]) for r in rows]
+
+    stdlib_app = Flask("stdlib")
+    stdlib_app.config["JSON_ENCODER"] = "stdlib"
+    configure_json(stdlib_app)
+    stdlib_app.json.sort_keys = True   # what Flask's default provider did before
+
+    paths = {
+        "stdlib, serialize() dicts": lambda: stdlib_app.json.dumps(
+            {"invoices": [inv.serialize() for inv in invoices], "next_cursor": None}).encode(),
+        "row template": lambda: ('{"invoices":[%s],"next_cursor":null}' % ",".join(
+            [render_row(row) for row in rows])).encode(),
+    }
+    if orjson is not None:
+        orjson_app = Flask("orjson")
+        configure_json(orjson_app)
+        paths["orjson, serialize() dicts"] = lambda: orjson_app.json.dumps_bytes(
+            {"invoices": [inv.serialize() for inv in invoices], "next_cursor": None})
+
+    print(f"Encoding {args.rows} invoices (best of {args.repeat})")
+    print(f"{'path':<28} {'ms':>9}")
+    payload = None
+    for name, fn in paths.items():
+        elapsed, body = best_of(args.repeat, fn)
+        print(f"{name:<28} {elapsed * 1000:9.2f}")
+        if name == "row template":
+            payload = body
+
+    codecs = {"identity": lambda data: data,
+              f"gzip -{COMPRESS_DEFAULTS['COMPRESS_GZIP_LEVEL']}": lambda data: gzip.compress(
+                  data, compresslevel=COMPRESS_DEFAULTS["COMPRESS_GZIP_LEVEL"], mtime=0)}
+    if brotli is not None:
+        codecs[f"br q{COMPRESS_DEFAULTS['COMPRESS_BROTLI_QUALITY']}"] = lambda data: brotli.compress(
+            data, quality=COMPRESS_DEFAULTS["COMPRESS_BROTLI_QUALITY"])
+    else:
+        print("(brotli not installed; skipping br)")
+
+    print(f"\n{'encoding':<12} {'bytes':>10} {'ratio':>7} {'ms':>9}")
+    for name, fn in codecs.items():
+        elapsed, data = best_of(args.repeat, lambda: fn(payload))
+        print(f"{name:<12} {len(data):>10} {len(data) / len(payload):>7.3f} {elapsed * 1000:9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
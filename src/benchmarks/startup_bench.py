@@ -0,0 +1,164 @@
+# src/benchmarks/startup_bench.py - Cold start cost: interpreter, `import app` and the first request
+"""Startup benchmark for serverless deployments.
+
+    $ cd src
+    $ python -m benchmarks.startup_bench --runs 10
+    $ python -m benchmarks.startup_bench --save-baseline
+    $ python -m benchmarks.startup_bench --compare      # exits 1 on regression
+
+Every run is a fresh interpreter, like a cold function instance: it times
+`import app` and the first and second GET /health through the test client
+(the first one also connects to the database and, with DB_CREATE_ALL=lazy,
+checks the schema). A separate run with `python -X importtime` lists the
+slowest imports under `app`. The database is a temporary SQLite file unless
+--db is given; a warm-up run creates its tables and the bytecode caches.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_baseline.json")
+METRICS = ("process_ms", "import_ms", "first_request_ms", "second_request_ms")
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+first = client.get('/health')
+first_done = time.perf_counter()
+second = client.get('/health')
+second_done = time.perf_counter()
+sys.stdout.write(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "first_request_ms": (first_done - imported) * 1000,
+    "second_request_ms": (second_done - first_done) * 1000,
+    "status": [first.status_code, second.status_code],
+}))
+"""
+
+
+def child_env(db_uri, create_all):
+    env = dict(os.environ, DATABASE_URL=db_uri, DB_CREATE_ALL=create_all,
+               PASSWORD_HASH_WORKERS="0", LOG_LEVEL="WARNING")
+    env.pop("FLASK_ENV", None)
+    return env
+
+
+def run_once(env):
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", CHILD], cwd=SRC_DIR, env=env,
+                          capture_output=True, text=True, check=True)
+    result = json.loads(proc.stdout)
+    result["process_ms"] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def interpreter_ms(runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def slowest_imports(env, top):
+    """(cumulative_us, self_us, module) for the modules imported directly under `app`."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=SRC_DIR,
+                          env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue   # the header line
+        # -X importtime indents by two spaces per level; `app` itself is at level 0
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= 1:
+            rows.append((int(cumulative_us), int(self_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name in METRICS:
+        base = baseline.get(name)
+        if base and results[name] > base * (1 + tolerance):
+            regressions.append(f"{name}: {results[name]:.1f}ms vs baseline {base:.1f}ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7, help="fresh interpreters to time (median reported)")
+    parser.add_argument("--db", help="SQLAlchemy URI (default: a temporary SQLite file)")
+    parser.add_argument("--create-all", default="lazy", choices=("lazy", "startup", "off"),
+                        help="DB_CREATE_ALL for the runs")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="fail if results regress past --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    db_uri = args.db or "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="invoice-startup-"), "startup.db")
+    env = child_env(db_uri, args.create_all)
+    # Warm-up: creates the tables and the .pyc files, which a deployed build already has
+    run_once(child_env(db_uri, "startup"))
+
+    runs = [run_once(env) for _ in range(args.runs)]
+    bad = [run["status"] for run in runs if run["status"] != [200, 200]]
+    if bad:
+        print(f"Unexpected /health status codes: {bad}")
+        return 2
+    results = {name: statistics.median(run[name] for run in runs) for name in METRICS}
+    results["interpreter_ms"] = interpreter_ms(args.runs)
+
+    print(f"Cold start, median of {args.runs} runs (DB_CREATE_ALL={args.create_all}, {db_uri})")
+    print(f"{'interpreter (python -c pass)':<30} {results['interpreter_ms']:>9.1f} ms")
+    print(f"{'import app':<30} {results['import_ms']:>9.1f} ms")
+    print(f"{'first request':<30} {results['first_request_ms']:>9.1f} ms")
+    print(f"{'second request':<30} {results['second_request_ms']:>9.1f} ms")
+    print(f"{'whole process':<30} {results['process_ms']:>9.1f} ms")
+
+    print(f"\nSlowest imports under app (python -X importtime, single run)")
+    print(f"{'module':<40} {'cumulative ms':>14} {'self ms':>9}")
+    for cumulative_us, self_us, name in slowest_imports(env, args.top):
+        print(f"{name:<40} {cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results, "runs": runs}, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"\nNo baseline at {args.baseline}; run with --save-baseline first")
+            return 2
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\nSTARTUP REGRESSION (tolerance {args.tolerance:.0%}):")
+            for line in regressions:
+                print("  - " + line)
+            return 1
+        print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -27,9 +27,9 @@ export const Private = () => {
     const [editAmount, setEditAmount] = useState("");
     const [editDate, setEditDate] = useState("");
 
-    // Get the token from either store or localStorage
+    // localStorage first: fetch.js stores the renewed token there after a refresh
     const getToken = () => {
-        return store.token || getStoredToken();
+        return getStoredToken() || store.token;
     };
 
     // Sync token from localStorage to store if missing
@@ -4,19 +4,64 @@ const BACKEND_URL = import.meta.env.VITE_BACKEND_URL || 'http://127.0.0.1:3001';
 
 console.log('🔧 Backend URL:', BACKEND_URL);
 
+// Access tokens live 15 minutes; one refresh request is shared by every call that hit a 401
+let refreshInFlight = null;
+
+export const refreshAccessToken = () => {
+    if (!refreshInFlight) {
+        refreshInFlight = (async () => {
+            const refreshToken = getStoredRefreshToken();
+            if (!refreshToken) {
+                throw new Error('Unauthorized - Please log in again');
+            }
+            console.log('🔄 Refreshing access token...');
+            const response = await fetch(`${BACKEND_URL}/api/token/refresh`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Authorization': `Bearer ${refreshToken}`
+                },
+            });
+            const data = await response.json().catch(() => ({}));
+            const token = data.token || data.access_token;
+            if (!response.ok || !token) {
+                // The refresh token expired or was revoked: the session is over
+                removeStoredToken();
+                throw new Error('Unauthorized - Please log in again');
+            }
+            // Refresh tokens are single-use; the server rotates them on every refresh
+            setStoredToken(token);
+            setStoredRefreshToken(data.refresh_token);
+            console.log('✅ Access token refreshed');
+            return token;
+        })().finally(() => {
+            refreshInFlight = null;
+        });
+    }
+    return refreshInFlight;
+};
+
 // Enhanced API fetch helper with comprehensive error handling
 const apiFetch = async (endpoint, options = {}) => {
     try {
         console.log(`🌐 Making request to: ${BACKEND_URL}${endpoint}`);
         
-        const response = await fetch(`${BACKEND_URL}${endpoint}`, {
+        const send = (headers) => fetch(`${BACKEND_URL}${endpoint}`, {
             ...options,
             headers: {
                 'Content-Type': 'application/json',
-                ...options.headers,
+                ...headers,
             },
         });
 
+        let response = await send(options.headers);
+
+        // An expired access token is renewed once and the request sent again with the new one
+        if (response.status === 401 && options.headers?.Authorization && getStoredRefreshToken()) {
+            const token = await refreshAccessToken();
+            response = await send({ ...options.headers, 'Authorization': `Bearer ${token}` });
+        }
+
         console.log(`📡 Response status: ${response.status} for ${endpoint}`);
 
         // Handle successful DELETE requests (204 No Content)
@@ -103,6 +148,10 @@ export const loginUser = async (email, password) => {
             throw new Error('No authentication token received from server');
         }
         
+        if (data.refresh_token) {
+            setStoredRefreshToken(data.refresh_token);
+        }
+        
         return {
             ...data,
             token: token
@@ -130,16 +179,30 @@ export const registerUser = async (email, password) => {
     }
 };
 
+// The list endpoint is keyset-paginated; follow next_cursor until every invoice is loaded
+const INVOICE_PAGE_SIZE = 1000;
+
 export const getInvoices = async (token) => {
     try {
         console.log('📋 Fetching invoices...');
         
-        const data = await apiFetch('/api/invoices', {
-            method: 'GET',
-            headers: { 'Authorization': `Bearer ${token}` }
-        });
+        const invoices = [];
+        let cursor = null;
+        do {
+            const params = new URLSearchParams({ limit: INVOICE_PAGE_SIZE });
+            if (cursor) {
+                params.set('cursor', cursor);
+            }
+            const page = await apiFetch(`/api/invoices?${params}`, {
+                method: 'GET',
+                headers: { 'Authorization': `Bearer ${getStoredToken() || token}` }
+            });
+            invoices.push(...(page.invoices || []));
+            cursor = page.next_cursor;
+        } while (cursor);
         
-        console.log('✅ Invoices fetched:', data);
+        const data = { invoices, next_cursor: null };
+        console.log('✅ Invoices fetched:', invoices.length);
         return data;
     } catch (error) {
         console.error('❌ Failed to fetch invoices:', error);
@@ -245,8 +308,19 @@ export const setStoredToken = (token) => {
     console.log('💾 Token stored successfully');
 };
 
+export const getStoredRefreshToken = () => {
+    return localStorage.getItem('refresh_token');
+};
+
+export const setStoredRefreshToken = (refreshToken) => {
+    if (refreshToken) {
+        localStorage.setItem('refresh_token', refreshToken);
+    }
+};
+
 export const removeStoredToken = () => {
     localStorage.removeItem('token');
+    localStorage.removeItem('refresh_token');
     console.log('🗑️ Token removed');
 };
 
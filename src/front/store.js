@@ -47,6 +47,7 @@ export default function storeReducer(store, action = {}) {
     case "CLEAR_TOKEN":
       console.log('🚪 LOGOUT/CLEAR_TOKEN: Clearing all auth data');
       localStorage.removeItem("token");
+      localStorage.removeItem("refresh_token");
       localStorage.removeItem("user");
       return {
         ...store,